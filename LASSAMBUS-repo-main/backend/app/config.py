@@ -1,23 +1,137 @@
 """Configuration and environment variable management"""
 import os
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
 
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Validate required environment variables
-MONGO_URL = os.environ.get('MONGO_URL')
-if not MONGO_URL:
-    raise ValueError("MONGO_URL environment variable is required")
+JWT_ALGORITHM = "HS256"
 
-DB_NAME = os.environ.get('DB_NAME')
-if not DB_NAME:
-    raise ValueError("DB_NAME environment variable is required")
+@dataclass(frozen=True)
+class Settings:
+    """
+    Connection settings and secrets. Unlike the tuning constants below, these are
+    only read and checked when an app or tool actually needs them, so importing
+    app modules does not require a configured environment.
+    """
+    mongo_url: str
+    db_name: str
+    jwt_secret: str
+    cors_origins: List[str] = field(default_factory=lambda: ['*'])
+    
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from environment variables, raising if a required one is missing"""
+        mongo_url = os.environ.get('MONGO_URL')
+        if not mongo_url:
+            raise ValueError("MONGO_URL environment variable is required")
+        
+        db_name = os.environ.get('DB_NAME')
+        if not db_name:
+            raise ValueError("DB_NAME environment variable is required")
+        
+        jwt_secret = os.environ.get('JWT_SECRET')
+        if not jwt_secret:
+            raise ValueError("JWT_SECRET environment variable is required. Do not use default secrets in production!")
+        
+        return cls(
+            mongo_url=mongo_url,
+            db_name=db_name,
+            jwt_secret=jwt_secret,
+            cors_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        )
 
-JWT_SECRET = os.environ.get('JWT_SECRET')
-if not JWT_SECRET:
-    raise ValueError("JWT_SECRET environment variable is required. Do not use default secrets in production!")
+_settings: Optional[Settings] = None
 
-JWT_ALGORITHM = "HS256"
-CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
+def get_settings() -> Settings:
+    """Settings read from the environment, for the default app and command-line tools"""
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env()
+    return _settings
+
+# Seconds before the in-memory hospital index is reloaded even without a local write,
+# so that changes made by other workers are eventually picked up
+HOSPITAL_INDEX_MAX_AGE = int(os.environ.get('HOSPITAL_INDEX_MAX_AGE', '60'))
+
+# Facility registry file synced into the hospitals collection at startup
+# (see app/registry.py); the sync is skipped while the file is unchanged
+HOSPITAL_REGISTRY_PATH = os.environ.get('HOSPITAL_REGISTRY_PATH', str(ROOT_DIR / 'app' / 'data' / 'hospitals.csv'))
+HOSPITAL_REGISTRY_SYNC = os.environ.get('HOSPITAL_REGISTRY_SYNC', 'true').lower() in ('1', 'true', 'yes')
+
+# How /api/hospitals/nearby resolves proximity: "memory" uses the in-process NumPy index,
+# "geonear" pushes the query into MongoDB through the 2dsphere index on hospitals.location
+NEARBY_QUERY_MODE = os.environ.get('NEARBY_QUERY_MODE', 'memory')
+if NEARBY_QUERY_MODE not in ('memory', 'geonear'):
+    raise ValueError("NEARBY_QUERY_MODE must be either 'memory' or 'geonear'")
+
+# Precomputed travel-time table for rank=eta (a directory written by
+# `python -m app.travel_time build`), and the average road speed used to estimate
+# ETAs from straight-line distance where the table has no entry
+TRAVEL_TIME_TABLE_PATH = os.environ.get('TRAVEL_TIME_TABLE_PATH')
+TRAVEL_FALLBACK_SPEED_KMH = float(os.environ.get('TRAVEL_FALLBACK_SPEED_KMH', '25'))
+
+# GeoJSON FeatureCollection of LGA boundary polygons used to fill in and correct
+# the LGA of incidents reported with coordinates; without the file LGAs are taken as
+# reported. LGA_NAME_PROPERTY names the feature property holding the LGA name
+LGA_BOUNDARIES_PATH = os.environ.get('LGA_BOUNDARIES_PATH', str(ROOT_DIR / 'app' / 'data' / 'lga_boundaries.geojson'))
+LGA_NAME_PROPERTY = os.environ.get('LGA_NAME_PROPERTY') or None
+
+# Weights of the composite score used when nearby hospitals are ranked with rank=score
+RANKING_WEIGHT_DISTANCE = float(os.environ.get('RANKING_WEIGHT_DISTANCE', '0.6'))
+RANKING_WEIGHT_BEDS = float(os.environ.get('RANKING_WEIGHT_BEDS', '0.2'))
+RANKING_WEIGHT_EXPERTISE = float(os.environ.get('RANKING_WEIGHT_EXPERTISE', '0.2'))
+
+# Password hashing: bcrypt cost factor, worker threads, and how many hash/verify calls
+# may be queued before new ones are rejected with 503
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+
+# User profile cache used on authenticated write paths. Profile changes made outside
+# this worker show up once the entry expires, i.e. within USER_CACHE_TTL seconds
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '60'))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+# When enabled, login tokens also carry the user's full name so incident creation
+# does not need to look the user up at all
+TOKEN_PROFILE_CLAIMS = os.environ.get('TOKEN_PROFILE_CLAIMS', 'false').lower() in ('1', 'true', 'yes')
+
+# Verified JWT payload cache; entries never outlive the token's own expiry
+TOKEN_CACHE_TTL = float(os.environ.get('TOKEN_CACHE_TTL', '300'))
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+# Seconds before a token revoked by another worker or instance is rejected here too
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', '5'))
+
+# Live bed-availability stream: seconds to coalesce updates before sending, maximum
+# concurrent subscribers, and whether to follow a MongoDB change stream (replica set only)
+BED_EVENTS_COALESCE_SECONDS = float(os.environ.get('BED_EVENTS_COALESCE_SECONDS', '0.5'))
+BED_EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('BED_EVENTS_MAX_SUBSCRIBERS', '1000'))
+BED_EVENTS_CHANGE_STREAM = os.environ.get('BED_EVENTS_CHANGE_STREAM', 'false').lower() in ('1', 'true', 'yes')
+
+# Optional bearer token required to scrape /metrics; leave unset to expose it openly
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Rate limiting. The storage URI is shared by every worker and instance:
+# "memory://" (single process only), "async+redis://host:6379" (needs the redis
+# package) or an "async+mongodb://" URL; counters are read and written without
+# blocking the event loop. Limits use the "N/period" syntax.
+RATE_LIMIT_STORAGE_URI = os.environ.get('RATE_LIMIT_STORAGE_URI', 'memory://')
+# Seconds to wait for the counter store, and how long to count in memory after it
+# fails before trying it again
+RATE_LIMIT_STORAGE_TIMEOUT = float(os.environ.get('RATE_LIMIT_STORAGE_TIMEOUT', '0.25'))
+RATE_LIMIT_BREAKER_SECONDS = float(os.environ.get('RATE_LIMIT_BREAKER_SECONDS', '30'))
+RATE_LIMIT_REGISTER = os.environ.get('RATE_LIMIT_REGISTER', '5/minute')
+RATE_LIMIT_LOGIN_PER_IP = os.environ.get('RATE_LIMIT_LOGIN_PER_IP', '60/minute')
+# Failed logins per account and client address; successful ones are not counted
+# and other addresses keep their own budget, so guessing cannot lock the owner out
+RATE_LIMIT_LOGIN_PER_ACCOUNT = os.environ.get('RATE_LIMIT_LOGIN_PER_ACCOUNT', '10/minute')
+RATE_LIMIT_WRITE = os.environ.get('RATE_LIMIT_WRITE', '120/minute')
+RATE_LIMIT_BULK = os.environ.get('RATE_LIMIT_BULK', '10/minute')
+
+# Production launcher (python -m app.serve): worker processes (defaults to the CPUs
+# available to this container) and seconds to let in-flight requests finish on SIGTERM
+WEB_CONCURRENCY = int(os.environ['WEB_CONCURRENCY']) if os.environ.get('WEB_CONCURRENCY') else None
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.environ.get('GRACEFUL_SHUTDOWN_TIMEOUT', '20'))
@@ -1,10 +1,62 @@
 """Database connection and initialization"""
-from motor.motor_asyncio import AsyncIOMotorClient
-from app.config import MONGO_URL, DB_NAME
+import os
+from fastapi import Request
+from app.config import Settings, get_settings
+from app.utils.metrics import mongo_command_listener
 
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+def create_client(settings: Settings):
+    """
+    New Motor client for `settings`. Motor is imported here, not at module import,
+    and clients are created inside the serving process (never before a fork), so
+    each worker has its own connection pool.
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+    # tz_aware: BSON dates come back as UTC-aware datetimes, matching what the models create
+    return AsyncIOMotorClient(settings.mongo_url, tz_aware=True, event_listeners=[mongo_command_listener])
+
+def get_db(request: Request):
+    """Route dependency: the database opened by the app's lifespan"""
+    return request.app.state.db
+
+# Process-wide client for command-line tools, which run without an app
+client = None
+_database = None
+
+def connect():
+    """Create this process's MongoDB client if needed and return the database"""
+    global client, _database
+    if client is None:
+        settings = get_settings()
+        client = create_client(settings)
+        _database = client[settings.db_name]
+    return _database
+
+def close():
+    """Close this process's MongoDB client; the next use opens a new one"""
+    global client, _database
+    if client is not None:
+        client.close()
+    client = _database = None
+
+def _forget_inherited_client():
+    # A forked child must not use (or close) the parent's client
+    global client, _database
+    client = _database = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_client)
 
 def get_database():
     """Get database instance"""
-    return db
+    return connect()
+
+class _DatabaseProxy:
+    """Module-level `db` that resolves to the current process's database on each access"""
+    
+    def __getattr__(self, name):
+        return getattr(connect(), name)
+    
+    def __getitem__(self, name):
+        return connect()[name]
+
+db = _DatabaseProxy()
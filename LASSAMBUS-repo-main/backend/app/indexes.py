@@ -0,0 +1,125 @@
+"""
+MongoDB index declarations and query-plan verification.
+
+Indexes are created at application startup by `ensure_indexes`. The router
+queries that depend on them are listed in `QUERY_PLANS`; tests/test_indexes.py
+creates the indexes on a scratch database and asserts via `explain()` that every
+one of those queries is answered by an index scan rather than a collection scan.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Sort order of incident listings; keyset pagination cursors follow the same key
+INCIDENT_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "incidents": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("personnel_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="personnel_created_at_id",
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        # Full-text search; a collection can have only one text index. Names and places
+        # are not English words, so terms are matched without stemming or stop words
+        IndexModel(
+            [("patient_name", TEXT), ("location", TEXT), ("description", TEXT)],
+            name="incident_text",
+            weights={"patient_name": 10, "location": 5, "description": 1},
+            default_language="none",
+        ),
+    ],
+    "incident_rollups": [
+        IndexModel([("granularity", ASCENDING), ("bucket", ASCENDING), ("lga", ASCENDING)], name="granularity_bucket_lga"),
+    ],
+    "hospitals": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("location", "2dsphere")], name="location_2dsphere"),
+    ],
+    "revoked_tokens": [
+        # Entries are removed once the revoked token has expired anyway
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        IndexModel([("revoked_at", ASCENDING)], name="revoked_at"),
+    ],
+}
+
+# Router queries that must be served by an index: (description, collection, filter, sort)
+QUERY_PLANS = [
+    ("auth: user by email", "users", {"email": "someone@example.com"}, None),
+    ("auth: user by id", "users", {"id": "user-id"}, None),
+    ("incidents: incident by id", "incidents", {"id": "incident-id"}, None),
+    ("incidents: personnel listing", "incidents", {"personnel_id": "user-id"}, INCIDENT_SORT),
+    ("incidents: admin listing", "incidents", {}, INCIDENT_SORT),
+    ("incidents: text search", "incidents", {"$text": {"$search": "ikeja"}}, None),
+    ("migrations: string created_at", "incidents", {"created_at": {"$type": "string"}}, None),
+    ("hospitals: hospital by id", "hospitals", {"id": "hosp-1"}, None),
+    ("auth: revocations since last sync", "revoked_tokens", {"revoked_at": {"$gte": datetime(2025, 1, 1)}}, None),
+]
+
+async def ensure_indexes(db):
+    """
+    Create every declared index; existing indexes with the same spec are left untouched.
+    A unique index that cannot be built raises RuntimeError: routes rely on them to
+    reject duplicates (e.g. registration on `email_unique`), so the app must not start
+    without them. Other failures are logged and the app keeps serving, only slower.
+    """
+    for collection, indexes in INDEXES.items():
+        names = []
+        for index in indexes:
+            spec = index.document
+            try:
+                names.extend(await db[collection].create_indexes([index]))
+            except OperationFailure as e:
+                if spec.get("unique"):
+                    # e.g. duplicate emails in legacy data
+                    raise RuntimeError(
+                        f"Cannot create unique index {collection}.{spec['name']}; "
+                        f"remove the duplicate values and restart: {e}"
+                    ) from e
+                logger.error(f"Could not create index {collection}.{spec['name']}: {e}")
+        logger.info(f"Ensured indexes on {collection}: {', '.join(names)}")
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain() plan tree"""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return [stage for stage in stages if stage]
+
+async def explain_stages(db, collection: str, query: dict, sort: Optional[list] = None) -> List[str]:
+    """Return the stages of the winning plan for a find query"""
+    cursor = db[collection].find(query, {"_id": 0}).limit(50)
+    if sort:
+        cursor = cursor.sort(sort)
+    explanation = await cursor.explain()
+    return _plan_stages(explanation["queryPlanner"]["winningPlan"])
+
+async def verify_query_plans(db) -> Dict[str, List[str]]:
+    """
+    Assert that each query in QUERY_PLANS uses an index scan.
+    Returns the winning-plan stages per query; raises AssertionError listing every failure.
+    """
+    results = {}
+    failures = []
+    for description, collection, query, sort in QUERY_PLANS:
+        stages = await explain_stages(db, collection, query, sort)
+        results[description] = stages
+        if "COLLSCAN" in stages or "IXSCAN" not in stages:
+            failures.append(f"{description}: {' <- '.join(stages)}")
+    
+    if failures:
+        raise AssertionError("Queries not served by an index:\n" + "\n".join(failures))
+    return results
@@ -1,14 +1,26 @@
 """Main FastAPI application"""
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 import logging
-import os
 
-from app.config import CORS_ORIGINS
-from app.database import db, client
-from app.routers import auth, incidents, hospitals
-from app.utils.rate_limit import limiter, RateLimitExceeded
+from app.config import (
+    Settings, get_settings, BED_EVENTS_CHANGE_STREAM, HOSPITAL_REGISTRY_SYNC, TRAVEL_TIME_TABLE_PATH
+)
+from app.database import create_client
+from app.indexes import ensure_indexes
+from app.migrations import run_startup_migrations
+from app.registry import sync_registry
+from app.travel_time import TravelTimeTable
+from app.routers import auth, incidents, hospitals, analytics, metrics
+from app.services import Services
+from app.utils.geo import LOCATION_FROM_COORDINATES
+from app.utils.lga_resolver import load_lga_resolver
+from app.utils.bed_events import watch_hospital_changes
+from app.utils.metrics import MetricsMiddleware, sample_event_loop_lag
+from app.utils.responses import FastJSONResponse
 
 # Initialize logging
 logging.basicConfig(
@@ -17,134 +29,130 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create FastAPI app
-app = FastAPI(
-    title="LASAMBUS API",
-    description="Lagos State Ambulance Service Management System API",
-    version="1.0.0"
-)
-
-# Add rate limiter to app
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, lambda request, exc: JSONResponse(
-    status_code=429,
-    content={"detail": f"Rate limit exceeded: {exc.detail}"}
-))
-
-# Include routers
-app.include_router(auth.router, prefix="/api")
-app.include_router(incidents.router, prefix="/api")
-app.include_router(hospitals.router, prefix="/api")
+async def init_data(db, services: Services):
+    """
+    Create indexes, finish pending data migrations, sync the hospital registry file
+    and load the app's hospital index and token revocations
+    """
+    await ensure_indexes(db)
+    await run_startup_migrations(db)
+    
+    if HOSPITAL_REGISTRY_SYNC:
+        try:
+            counts = await sync_registry(db)
+        except (OSError, ValueError) as e:
+            # Keep serving the hospitals already stored rather than refusing to start
+            logger.error(f"Hospital registry not synced: {e}")
+        else:
+            if not counts["skipped"]:
+                logger.info(f"Synced hospital registry: {counts['inserted']} added, {counts['modified']} updated")
+    
+    # Backfill GeoJSON locations for hospitals stored before the field existed
+    result = await db.hospitals.update_many({"location": {"$exists": False}}, LOCATION_FROM_COORDINATES)
+    if result.modified_count:
+        logger.info(f"Added GeoJSON location to {result.modified_count} hospitals")
+    
+    hospital_index = services.hospital_index
+    if TRAVEL_TIME_TABLE_PATH and hospital_index.travel_table is None:
+        try:
+            hospital_index.set_travel_table(TravelTimeTable.load(TRAVEL_TIME_TABLE_PATH))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Travel-time table not loaded, ETAs will be estimated from distance: {e}")
+    
+    if services.lga_resolver is None:
+        services.lga_resolver = load_lga_resolver()
+    
+    await services.tokens.sync_revocations(db)
+    
+    await hospital_index.refresh(db)
+    services.hospital_list_cache.bump()
+    
+    if hospital_index.travel_table is not None:
+        covered = int((hospital_index.travel_columns >= 0).sum())
+        logger.info(f"Travel-time table covers {covered} of {len(hospital_index)} hospitals")
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=CORS_ORIGINS,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Responses that stay open for as long as the client wants; excluded from latency metrics
+STREAMING_ROUTES = ("/api/hospitals/beds/stream", "/api/incidents/export")
 
-# Startup event: Initialize hospital data
-@app.on_event("startup")
-async def init_data():
-    lagos_hospitals = [
-        {
-            "id": "hosp-1",
-            "name": "Lagos State University Teaching Hospital (LASUTH)",
-            "address": "1-5 Oba Akinjobi Way, Ikeja",
-            "lga": "Ikeja",
-            "available_beds": 45,
-            "expertise": ["Trauma", "Surgery", "Emergency", "Cardiology", "Pediatrics"],
-            "phone": "01-773-6120",
-            "latitude": 6.5964,
-            "longitude": 3.3486
-        },
-        {
-            "id": "hosp-2",
-            "name": "Lagos Island General Hospital",
-            "address": "Lagos Island",
-            "lga": "Lagos Island",
-            "available_beds": 28,
-            "expertise": ["Emergency", "Surgery", "Obstetrics"],
-            "phone": "01-263-3721",
-            "latitude": 6.4541,
-            "longitude": 3.3947
-        },
-        {
-            "id": "hosp-3",
-            "name": "General Hospital Gbagada",
-            "address": "Gbagada Expressway",
-            "lga": "Kosofe",
-            "available_beds": 32,
-            "expertise": ["Trauma", "Pediatrics", "Obstetrics", "Emergency"],
-            "phone": "01-763-2109",
-            "latitude": 6.5533,
-            "longitude": 3.3786
-        },
-        {
-            "id": "hosp-4",
-            "name": "Ikorodu General Hospital",
-            "address": "Ikorodu Town",
-            "lga": "Ikorodu",
-            "available_beds": 18,
-            "expertise": ["Emergency", "Surgery", "Pediatrics"],
-            "phone": "01-891-2034",
-            "latitude": 6.6198,
-            "longitude": 3.5073
-        },
-        {
-            "id": "hosp-5",
-            "name": "General Hospital Badagry",
-            "address": "Badagry Town",
-            "lga": "Badagry",
-            "available_beds": 15,
-            "expertise": ["Emergency", "Trauma", "Surgery"],
-            "phone": "01-891-5678",
-            "latitude": 6.4173,
-            "longitude": 2.8876
-        },
-        {
-            "id": "hosp-6",
-            "name": "General Hospital Surulere",
-            "address": "Randle Avenue, Surulere",
-            "lga": "Surulere",
-            "available_beds": 25,
-            "expertise": ["Cardiology", "Emergency", "Surgery", "Neurology"],
-            "phone": "01-583-7421",
-            "latitude": 6.4968,
-            "longitude": 3.3547
-        },
-        {
-            "id": "hosp-7",
-            "name": "Apapa General Hospital",
-            "address": "Apapa Road",
-            "lga": "Apapa",
-            "available_beds": 12,
-            "expertise": ["Emergency", "Trauma"],
-            "phone": "01-587-2134",
-            "latitude": 6.4509,
-            "longitude": 3.3594
-        },
-        {
-            "id": "hosp-8",
-            "name": "Epe General Hospital",
-            "address": "Epe Town",
-            "lga": "Epe",
-            "available_beds": 10,
-            "expertise": ["Emergency", "Obstetrics", "Pediatrics"],
-            "phone": "01-705-8291",
-            "latitude": 6.5833,
-            "longitude": 3.9833
-        }
-    ]
+def create_app(settings: Optional[Settings] = None, database=None) -> FastAPI:
+    """
+    Build the API application.
+    - `settings` defaults to the environment (MONGO_URL, DB_NAME, JWT_SECRET, CORS_ORIGINS)
+    - `database` replaces the MongoDB database, e.g. an in-memory one in tests; no
+      client is opened then
+    The MongoDB client and background tasks are opened and closed by the app's
+    lifespan, so each worker process gets its own. Caches, indexes, LGA boundaries,
+    the hashing pool and the rate limiter belong to the app (`app.state.services`),
+    not to the process.
+    """
+    settings = settings or get_settings()
+    services = Services(settings)
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        client = None
+        db = database
+        if db is None:
+            client = create_client(settings)
+            db = client[settings.db_name]
+        app.state.db = db
+        
+        await init_data(db, services)
+        tasks = [
+            asyncio.create_task(sample_event_loop_lag()),
+            # Pick up tokens revoked by other workers
+            asyncio.create_task(services.tokens.follow_revocations(db)),
+        ]
+        # Follow hospital changes made by other workers or tools (replica set only)
+        if BED_EVENTS_CHANGE_STREAM:
+            tasks.append(asyncio.create_task(watch_hospital_changes(db, services.apply_bed_count, services.reload_hospitals)))
+        
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if client is not None:
+                client.close()
+            await services.passwords.shutdown()
+    
+    app = FastAPI(
+        title="LASAMBUS API",
+        description="Lagos State Ambulance Service Management System API",
+        version="1.0.0",
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan
+    )
+    app.state.services = services
+    
+    # Include routers
+    app.include_router(auth.router, prefix="/api")
+    app.include_router(incidents.router, prefix="/api")
+    app.include_router(hospitals.router, prefix="/api")
+    app.include_router(analytics.router, prefix="/api")
+    app.include_router(metrics.router)
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=settings.cors_origins,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
+    )
+    
+    # Per-route latency and status metrics (outermost, so it sees every response)
+    app.add_middleware(MetricsMiddleware, untimed_routes=STREAMING_ROUTES)
     
-    existing_count = await db.hospitals.count_documents({})
-    if existing_count == 0:
-        await db.hospitals.insert_many(lagos_hospitals)
-        logger.info(f"Initialized {len(lagos_hospitals)} hospitals")
+    return app
 
-# Shutdown event: Close database connection
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+def __getattr__(name):
+    # `app.main:app` (uvicorn, server.py) builds the app from the environment on first
+    # access, so importing this module for create_app needs no configuration
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
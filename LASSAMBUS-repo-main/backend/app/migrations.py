@@ -0,0 +1,108 @@
+"""
+One-shot data migrations.
+
+Run from the backend directory:
+
+    python -m app.migrations
+
+Converts `created_at` values stored as ISO-8601 strings on users and incidents
+into native BSON dates; only string values are touched. The app also runs this
+conversion at every startup, so rows written with string dates later (e.g. by an
+older app version during a rolling deploy) are converted too and keyset pages
+(which compare dates) never skip them. When LGA boundaries are
+configured (LGA_BOUNDARIES_PATH), it also corrects the LGA of incidents whose
+coordinates fall in a different LGA, keeping the reported one in `reported_lga`.
+Both steps are idempotent. Rebuild the analytics rollups afterwards if any LGA
+was corrected.
+"""
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+async def migrate_created_at_to_dates(db, collection: str, batch_size: int = BATCH_SIZE) -> int:
+    """Convert string `created_at` values to BSON dates in batches; returns the number converted"""
+    converted = 0
+    cursor = db[collection].find({"created_at": {"$type": "string"}}, {"_id": 1, "created_at": 1})
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        try:
+            created_at = _parse_timestamp(doc["created_at"])
+        except ValueError:
+            logger.warning(f"Skipping {collection} {doc['_id']}: unparseable created_at {doc['created_at']!r}")
+            continue
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"created_at": created_at}}))
+        if len(batch) >= batch_size:
+            converted += (await db[collection].bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        converted += (await db[collection].bulk_write(batch, ordered=False)).modified_count
+    return converted
+
+async def run_startup_migrations(db):
+    """
+    Convert any string `created_at` values. Cheap when there are none: on incidents
+    the `$type` query is answered from the created_at index. Safe to run from several
+    workers at once, and as often as needed; each conversion is idempotent.
+    """
+    for collection in ("users", "incidents"):
+        converted = await migrate_created_at_to_dates(db, collection)
+        if converted:
+            logger.info(f"Converted {converted} {collection} created_at values to dates")
+
+async def backfill_incident_lgas(db, resolver, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Set each located incident's LGA to the one its coordinates resolve to, in batches;
+    returns the number corrected
+    """
+    corrected = 0
+    cursor = db.incidents.find(
+        {"latitude": {"$type": "number"}, "longitude": {"$type": "number"}},
+        {"_id": 1, "lga": 1, "reported_lga": 1, "latitude": 1, "longitude": 1},
+    )
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        resolved = resolver.resolve(doc["latitude"], doc["longitude"])
+        if resolved is None or resolved == doc.get("lga"):
+            continue
+        batch.append(UpdateOne(
+            {"_id": doc["_id"]},
+            # An incident corrected before keeps the LGA it was originally reported with
+            {"$set": {"lga": resolved, "reported_lga": doc.get("reported_lga") or doc.get("lga")}},
+        ))
+        if len(batch) >= batch_size:
+            corrected += (await db.incidents.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        corrected += (await db.incidents.bulk_write(batch, ordered=False)).modified_count
+    return corrected
+
+async def _main() -> int:
+    from app.database import db
+    from app.utils.lga_resolver import load_lga_resolver
+    
+    for collection in ("users", "incidents"):
+        converted = await migrate_created_at_to_dates(db, collection)
+        logger.info(f"Converted {converted} {collection} created_at values to dates")
+    
+    resolver = load_lga_resolver()
+    if resolver is not None:
+        corrected = await backfill_incident_lgas(db, resolver)
+        logger.info(f"Corrected the LGA of {corrected} incidents from their coordinates")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main()))
@@ -1,6 +1,11 @@
 """Hospital-related Pydantic models"""
 from pydantic import BaseModel, ConfigDict, Field
-from typing import List
+from typing import List, Literal, Optional
+
+class GeoPoint(BaseModel):
+    """GeoJSON Point; coordinates are [longitude, latitude]"""
+    type: Literal["Point"] = "Point"
+    coordinates: List[float] = Field(..., min_length=2, max_length=2)
 
 class Hospital(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -9,7 +14,40 @@ class Hospital(BaseModel):
     address: str
     lga: str
     available_beds: int
+    # Total beds according to the facility registry; optional for older records
+    bed_capacity: Optional[int] = Field(None, ge=0)
     expertise: List[str]
     phone: str
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
+    location: Optional[GeoPoint] = None
+
+class NearbyQuery(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+    condition: Optional[str] = None
+
+class NearbyBatchRequest(BaseModel):
+    queries: List[NearbyQuery] = Field(..., min_length=1, max_length=200)
+    limit: int = Field(10, ge=1, le=50)
+    max_km: Optional[float] = Field(None, gt=0)
+    rank: Literal["distance", "score", "eta"] = "distance"
+
+class RankingWeights(BaseModel):
+    """
+    Weights of the composite hospital score. Each component is normalised to [0, 1]:
+    - distance: 1 / (1 + km / distance_scale_km)
+    - beds: available beds capped at bed_saturation, divided by bed_saturation
+    - expertise: 1 when the hospital lists the requested condition as an expertise
+    """
+    distance: float = Field(0.6, ge=0)
+    beds: float = Field(0.2, ge=0)
+    expertise: float = Field(0.2, ge=0)
+    distance_scale_km: float = Field(10.0, gt=0)
+    bed_saturation: int = Field(20, gt=0)
+
+class NearbyBatchResult(BaseModel):
+    lat: float
+    lon: float
+    condition: Optional[str] = None
+    hospitals: List[dict]
@@ -1,8 +1,10 @@
 """Incident-related Pydantic models"""
 import uuid
 from datetime import datetime, timezone
-from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from pydantic.json_schema import SkipJsonSchema
+from typing import Any, Dict, List, Optional
+from app.utils.lga_resolver import LgaResolver
 from app.utils.validation import validate_lga, get_valid_lgas
 
 class Incident(BaseModel):
@@ -13,20 +15,36 @@ class Incident(BaseModel):
     patient_sex: str
     location: str
     lga: str
+    # The LGA as reported, when it disagreed with the coordinates and `lga` was corrected
+    reported_lga: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     description: str
     action_taken: str
     transfer_to_hospital: bool = False
     hospital_id: Optional[str] = None
+    # Hospital holding a bed for this incident; internal, not part of API responses
+    reserved_hospital_id: Optional[str] = Field(None, exclude=True)
     personnel_id: str
     personnel_name: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class IncidentSearchResult(Incident):
+    # Text-search relevance; higher is a better match
+    score: float
+
 class IncidentCreate(BaseModel):
     patient_name: str = Field(..., min_length=1, max_length=200)
     patient_age: Optional[int] = Field(None, ge=0, le=150)
     patient_sex: str = Field(..., pattern="^(Male|Female)$")
     location: str = Field(..., min_length=1, max_length=500)
-    lga: str = Field(..., min_length=1, max_length=100)
+    # Optional when coordinates are given and LGA boundaries are loaded: it is then
+    # filled in from the point, or corrected to it if the reported one differs
+    lga: Optional[str] = Field(None, min_length=1, max_length=100)
+    # Set by the coordinate check below; a value sent by the client is discarded
+    reported_lga: SkipJsonSchema[Optional[str]] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     description: str = Field(..., min_length=10, max_length=2000)
     action_taken: str = Field(..., min_length=10, max_length=2000)
     transfer_to_hospital: bool = False
@@ -35,7 +53,7 @@ class IncidentCreate(BaseModel):
     @field_validator('lga')
     @classmethod
     def validate_lga(cls, v):
-        if not validate_lga(v):
+        if v is not None and not validate_lga(v):
             valid_lgas = ', '.join(get_valid_lgas()[:5])  # Show first 5
             raise ValueError(f'Invalid LGA. Must be one of the valid Lagos LGAs (e.g., {valid_lgas}...)')
         return v
@@ -47,7 +65,63 @@ class IncidentCreate(BaseModel):
         if isinstance(v, str):
             return ' '.join(v.strip().split())
         return v
+    
+    @model_validator(mode='after')
+    def validate_coordinates(self):
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError('latitude and longitude must be given together')
+        self.reported_lga = None
+        return self
+    
+    def resolve_lga(self, resolver: Optional[LgaResolver]):
+        """
+        Fill in or correct `lga` from the coordinates with the app's LGA boundaries, if
+        any. Raises ValueError when the LGA is neither reported nor resolved.
+        """
+        resolved = resolver.resolve(self.latitude, self.longitude) if resolver and self.latitude is not None else None
+        if resolved is not None:
+            # The point is more reliable than an LGA picked from a list in a hurry, so a
+            # mismatch is corrected rather than rejected, keeping what was reported
+            if self.lga is not None and self.lga != resolved:
+                self.reported_lga = self.lga
+            self.lga = resolved
+        elif self.lga is None:
+            raise ValueError('lga is required unless it can be resolved from latitude and longitude')
 
 class IncidentUpdate(BaseModel):
     transfer_to_hospital: bool
     hospital_id: Optional[str] = None
+
+class BulkIncidentItem(IncidentCreate):
+    """
+    An incident queued offline. Devices may supply the incident `id` so that a replayed
+    batch is idempotent, and `created_at` to record when it was actually captured.
+    """
+    id: Optional[str] = Field(None, min_length=1, max_length=100)
+    created_at: Optional[datetime] = None
+    
+    @field_validator('created_at')
+    @classmethod
+    def validate_created_at(cls, v):
+        if v is None:
+            return v
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=timezone.utc)
+        if v > datetime.now(timezone.utc):
+            raise ValueError('created_at cannot be in the future')
+        return v
+
+class BulkIncidentRequest(BaseModel):
+    # Items are validated one by one so a bad report does not reject the whole batch
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=500)
+
+class BulkIncidentResult(BaseModel):
+    index: int
+    status: str  # "created" | "duplicate" | "invalid" | "error"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkIncidentResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkIncidentResult]
@@ -0,0 +1,150 @@
+"""
+Hospital registry sync.
+
+The list of facilities lives in a CSV file (app/data/hospitals.csv by default,
+HOSPITAL_REGISTRY_PATH to override) kept under version control. Syncing upserts
+every row by `id` with batched, unordered bulk writes and records the file's
+SHA-256, so an unchanged file is skipped without touching the hospitals. The
+app syncs at startup; to sync by hand, run from the backend directory:
+
+    python -m app.registry [--file PATH] [--force]
+
+CSV columns: id, name, address, lga, bed_capacity, available_beds, expertise
+(separated by ";"), phone, latitude, longitude. `available_beds` is only the
+starting count for a newly added facility; afterwards it is live state owned by
+bed reservations and is never overwritten by a sync. Facilities missing from
+the file are left in place, since incidents refer to them.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import logging
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import HOSPITAL_REGISTRY_PATH
+from app.models.hospital import Hospital
+from app.utils.geo import geo_point
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_STATE_COLLECTION = "registry_state"
+REGISTRY_STATE_ID = "hospitals"
+SYNC_BATCH_SIZE = 1000
+
+def file_digest(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def load_registry(path: Path) -> List[dict]:
+    """Parse and validate the registry CSV; raises ValueError naming the bad line"""
+    hospitals = []
+    seen = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            line = reader.line_num
+            row = {key: (value or "").strip() for key, value in row.items() if key}
+            row["expertise"] = [tag.strip() for tag in row.get("expertise", "").split(";") if tag.strip()]
+            if not row.get("bed_capacity"):
+                row.pop("bed_capacity", None)
+            try:
+                hospital = Hospital.model_validate(row)
+            except ValidationError as e:
+                raise ValueError(f"{path}:{line}: {e.errors()[0]['loc'][0]}: {e.errors()[0]['msg']}")
+            if hospital.id in seen:
+                raise ValueError(f"{path}:{line}: duplicate hospital id {hospital.id!r}")
+            seen.add(hospital.id)
+            hospitals.append(hospital.model_dump(exclude={"location"}))
+    return hospitals
+
+def upsert_operations(hospitals: List[dict]) -> List[UpdateOne]:
+    operations = []
+    for hospital in hospitals:
+        fields = {key: value for key, value in hospital.items() if key != "available_beds"}
+        fields["location"] = geo_point(hospital["latitude"], hospital["longitude"])
+        operations.append(UpdateOne(
+            {"id": hospital["id"]},
+            {"$set": fields, "$setOnInsert": {"available_beds": hospital["available_beds"]}},
+            upsert=True,
+        ))
+    return operations
+
+async def sync_registry(db, path: Optional[Path] = None, force: bool = False, batch_size: int = SYNC_BATCH_SIZE) -> dict:
+    """
+    Upsert the registry file into the hospitals collection unless its hash matches
+    the last sync. Returns counts of matched, modified and inserted hospitals, or
+    {"skipped": True} when nothing was done.
+    """
+    path = Path(path or HOSPITAL_REGISTRY_PATH)
+    digest = file_digest(path)
+    state = db[REGISTRY_STATE_COLLECTION]
+    if not force:
+        previous = await state.find_one({"_id": REGISTRY_STATE_ID}, {"sha256": 1})
+        if previous and previous.get("sha256") == digest:
+            return {"skipped": True}
+    
+    hospitals = load_registry(path)
+    operations = upsert_operations(hospitals)
+    counts = {"skipped": False, "rows": len(hospitals), "matched": 0, "modified": 0, "inserted": 0}
+    for start in range(0, len(operations), batch_size):
+        batch = operations[start:start + batch_size]
+        try:
+            result = await db.hospitals.bulk_write(batch, ordered=False)
+        except BulkWriteError as e:
+            # Another worker syncing at the same time inserted some of these first;
+            # running the batch again turns those upserts into plain updates
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            result = await db.hospitals.bulk_write(batch, ordered=False)
+        counts["matched"] += result.matched_count
+        counts["modified"] += result.modified_count
+        counts["inserted"] += result.upserted_count
+    
+    # Recorded only after every batch succeeded, so a failed sync is retried next time
+    await state.update_one(
+        {"_id": REGISTRY_STATE_ID},
+        {"$set": {"sha256": digest, "path": str(path), "rows": len(hospitals),
+                  "synced_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return counts
+
+async def _main() -> int:
+    parser = argparse.ArgumentParser(description="Sync the hospital registry file into MongoDB")
+    parser.add_argument("--file", type=Path, default=None, help="registry CSV (default: HOSPITAL_REGISTRY_PATH)")
+    parser.add_argument("--force", action="store_true", help="sync even if the file has not changed")
+    args = parser.parse_args()
+    
+    from app.database import db
+    
+    try:
+        counts = await sync_registry(db, args.file, args.force)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    if counts["skipped"]:
+        logger.info("Hospital registry unchanged since the last sync; nothing to do (use --force to sync anyway)")
+    else:
+        logger.info(
+            f"Synced {counts['rows']} hospitals: {counts['inserted']} added, {counts['modified']} updated"
+        )
+        logger.info(
+            "Running workers reload now if they follow the hospital change stream "
+            "(BED_EVENTS_CHANGE_STREAM), otherwise within HOSPITAL_INDEX_MAX_AGE seconds"
+        )
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,135 @@
+"""
+Incrementally maintained incident rollups.
+
+Counts of incidents per (granularity, time bucket, LGA) live in the
+`incident_rollups` collection, with the number transferred to hospital alongside
+the total. Incident writes update them with `$inc` upserts; to rebuild them from
+scratch with an aggregation pipeline, run from the backend directory:
+
+    python -m app.rollups
+
+Stop the API (every worker) while the rebuild runs. An increment applied between the
+pipeline reading a bucket's incidents and `$merge` replacing the bucket is either lost
+or counted twice, and nothing detects the drift until the next rebuild.
+"""
+import asyncio
+import logging
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "incident_rollups"
+GRANULARITIES = ("hour", "day")
+
+def bucket_start(created_at: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its hour or day (UTC)"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    created_at = created_at.astimezone(timezone.utc)
+    if granularity == "day":
+        return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return created_at.replace(minute=0, second=0, microsecond=0)
+
+def _rollup_id(granularity: str, bucket: datetime, lga: str) -> str:
+    return f"{granularity}|{bucket.isoformat()}|{lga}"
+
+def rollup_updates(changes: Iterable[Tuple[datetime, str, int, int]]) -> list:
+    """
+    Build `$inc` upserts from (created_at, lga, total_delta, transferred_delta) tuples,
+    merging changes that land in the same bucket.
+    """
+    deltas: Dict[Tuple[str, datetime, str], list] = defaultdict(lambda: [0, 0])
+    for created_at, lga, total, transferred in changes:
+        for granularity in GRANULARITIES:
+            delta = deltas[(granularity, bucket_start(created_at, granularity), lga)]
+            delta[0] += total
+            delta[1] += transferred
+    
+    return [
+        UpdateOne(
+            {"_id": _rollup_id(granularity, bucket, lga)},
+            {
+                "$setOnInsert": {"granularity": granularity, "bucket": bucket, "lga": lga},
+                "$inc": {"total": total, "transferred": transferred},
+            },
+            upsert=True,
+        )
+        for (granularity, bucket, lga), (total, transferred) in deltas.items()
+        if total or transferred
+    ]
+
+async def apply_rollup_changes(db, changes: Iterable[Tuple[datetime, str, int, int]]):
+    """
+    Apply rollup changes in one bulk write. Failures are logged rather than raised:
+    the incident write has already succeeded and a backfill repairs any drift.
+    """
+    try:
+        updates = rollup_updates(changes)
+        if updates:
+            await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to update incident rollups: {e}")
+
+async def record_incidents_created(db, docs: Iterable[dict]):
+    """Count newly inserted incident documents"""
+    await apply_rollup_changes(db, (
+        (doc["created_at"], doc["lga"], 1, int(bool(doc.get("transfer_to_hospital"))))
+        for doc in docs
+    ))
+
+async def record_transfer_change(db, previous: dict, transfer_to_hospital: bool):
+    """Adjust transferred counts when an incident's transfer status flips"""
+    delta = int(transfer_to_hospital) - int(bool(previous.get("transfer_to_hospital")))
+    if delta:
+        await apply_rollup_changes(db, [(previous["created_at"], previous["lga"], 0, delta)])
+
+def rebuild_pipeline(granularity: str) -> list:
+    """Aggregation that recomputes one granularity of rollups and merges it into place"""
+    bucket = {"$dateTrunc": {"date": "$created_at", "unit": granularity}}
+    return [
+        {"$match": {"created_at": {"$type": "date"}}},
+        {"$group": {
+            "_id": {"bucket": bucket, "lga": "$lga"},
+            "total": {"$sum": 1},
+            "transferred": {"$sum": {"$cond": ["$transfer_to_hospital", 1, 0]}},
+        }},
+        {"$project": {
+            "_id": {"$concat": [
+                granularity, "|",
+                {"$dateToString": {"date": "$_id.bucket", "format": "%Y-%m-%dT%H:%M:%S+00:00"}},
+                "|", "$_id.lga",
+            ]},
+            "granularity": granularity,
+            "bucket": "$_id.bucket",
+            "lga": "$_id.lga",
+            "total": 1,
+            "transferred": 1,
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+async def rebuild_rollups(db):
+    """
+    Recompute every rollup from the incidents collection (requires MongoDB 5.0+).
+    Buckets are replaced in place rather than dropped first. Incident writes must be
+    paused while it runs (see the module docstring).
+    """
+    for granularity in GRANULARITIES:
+        await db.incidents.aggregate(rebuild_pipeline(granularity)).to_list(None)
+    return await db[ROLLUP_COLLECTION].count_documents({})
+
+async def _main() -> int:
+    from app.database import db
+    
+    count = await rebuild_rollups(db)
+    logger.info(f"Rebuilt {count} incident rollup documents")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main()))
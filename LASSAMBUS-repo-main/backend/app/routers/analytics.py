@@ -0,0 +1,56 @@
+"""Analytics routes"""
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+
+from app.utils.jwt import verify_admin
+from app.rollups import ROLLUP_COLLECTION, bucket_start
+from app.database import get_db
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/incidents")
+async def get_incident_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    lga: Optional[str] = None,
+    payload: dict = Depends(verify_admin),
+    db=Depends(get_db)
+):
+    """
+    Incident counts over time, by LGA and by transfer status (admin only).
+    Served from the incrementally maintained rollups, so the cost depends on the
+    number of time buckets, not the number of incidents. Defaults to the last 30 days.
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    
+    query = {
+        "granularity": granularity,
+        "bucket": {"$gte": bucket_start(start, granularity), "$lt": end},
+    }
+    if lga:
+        query["lga"] = lga
+    
+    series = {}
+    by_lga = {}
+    totals = {"total": 0, "transferred": 0}
+    async for rollup in db[ROLLUP_COLLECTION].find(query, {"_id": 0}).sort("bucket", 1):
+        for bucket in (
+            series.setdefault(rollup["bucket"], {"bucket": rollup["bucket"], "total": 0, "transferred": 0}),
+            by_lga.setdefault(rollup["lga"], {"total": 0, "transferred": 0}),
+            totals,
+        ):
+            bucket["total"] += rollup["total"]
+            bucket["transferred"] += rollup["transferred"]
+    
+    totals["not_transferred"] = totals["total"] - totals["transferred"]
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "totals": totals,
+        "series": list(series.values()),
+        "by_lga": by_lga,
+    }
@@ -1,21 +1,30 @@
 """Authentication routes"""
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.security import HTTPAuthorizationCredentials
 from typing import Optional
-from datetime import datetime
 import logging
+from pymongo.errors import DuplicateKeyError
 
 from app.models.user import User, UserCreate, LoginRequest, LoginResponse
-from app.utils.jwt import verify_token_optional, create_access_token
-from app.utils.password import hash_password, verify_password
-from app.utils.rate_limit import limiter
-from app.database import db
+from app.utils.jwt import verify_token_optional, security
+from app.utils.rate_limit import rate_limit, user_or_ip_key, get_remote_address
+from app.config import (
+    TOKEN_PROFILE_CLAIMS, RATE_LIMIT_REGISTER, RATE_LIMIT_LOGIN_PER_IP, RATE_LIMIT_LOGIN_PER_ACCOUNT
+)
+from app.database import get_db
+from app.services import get_services
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-@router.post("/register", response_model=User)
-@limiter.limit("5/minute")  # 5 registrations per minute per IP
-async def register(request: Request, user_data: UserCreate, payload: Optional[dict] = Depends(verify_token_optional)):
+# Registration is limited per admin, or per IP for self-registration
+@router.post("/register", response_model=User, dependencies=[Depends(rate_limit(RATE_LIMIT_REGISTER, user_or_ip_key))])
+async def register(
+    user_data: UserCreate,
+    payload: Optional[dict] = Depends(verify_token_optional),
+    db=Depends(get_db),
+    services=Depends(get_services)
+):
     """
     Register a new user.
     - Personnel accounts can be created by anyone
@@ -30,20 +39,15 @@ async def register(request: Request, user_data: UserCreate, payload: Optional[di
             )
         
         # Verify the requester is an admin
-        requester = await db.users.find_one({"id": payload["sub"]}, {"_id": 0})
+        requester = await services.user_cache.profile(db, payload["sub"])
         if not requester or requester.get("role") != "admin":
             raise HTTPException(
                 status_code=403,
                 detail="Only administrators can create admin accounts"
             )
     
-    # Check if email already exists
-    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
     # Hash password
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await services.passwords.hash(user_data.password)
     
     # Create user object
     user_obj = User(
@@ -55,30 +59,54 @@ async def register(request: Request, user_data: UserCreate, payload: Optional[di
     # Prepare document for database
     doc = user_obj.model_dump()
     doc['password'] = hashed_password
-    doc['created_at'] = doc['created_at'].isoformat()
     
-    # Insert into database
-    await db.users.insert_one(doc)
+    # Insert into database; the unique email index rejects duplicates
+    try:
+        await db.users.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    services.user_cache.invalidate(user_obj.id)
     
     logger.info(f"New {user_data.role} account created: {user_data.email}")
     return user_obj
 
-@router.post("/login", response_model=LoginResponse)
-@limiter.limit("10/minute")  # 10 login attempts per minute per IP
-async def login(request: Request, login_data: LoginRequest):
+# Generous per IP: a hospital NAT shares one address
+@router.post("/login", response_model=LoginResponse, dependencies=[Depends(rate_limit(RATE_LIMIT_LOGIN_PER_IP))])
+async def login(
+    login_data: LoginRequest,
+    request: Request,
+    db=Depends(get_db),
+    services=Depends(get_services)
+):
+    # The budget of failed attempts per account and address is what stops password
+    # guessing. Successful logins are not counted, and failures from one address
+    # never lock the account out for its owner somewhere else
+    account = f"{login_data.email.lower().strip()}|{get_remote_address(request)}"
+    await services.limiter.check(RATE_LIMIT_LOGIN_PER_ACCOUNT, "login-failures", account)
     user_doc = await db.users.find_one({"email": login_data.email}, {"_id": 0})
-    if not user_doc or not verify_password(login_data.password, user_doc['password']):
+    if not user_doc or not await services.passwords.verify(login_data.password, user_doc['password']):
+        await services.limiter.count(RATE_LIMIT_LOGIN_PER_ACCOUNT, "login-failures", account)
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     user_obj = User(**{k: v for k, v in user_doc.items() if k != 'password'})
     
-    token = create_access_token({
+    claims = {
         "sub": user_obj.id,
         "email": user_obj.email,
         "role": user_obj.role
-    })
+    }
+    if TOKEN_PROFILE_CLAIMS:
+        claims["name"] = user_obj.full_name
+    token = services.tokens.create(claims)
     
     return LoginResponse(token=token, user=user_obj)
+
+@router.post("/logout", status_code=204)
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db=Depends(get_db),
+    services=Depends(get_services)
+):
+    """Revoke the bearer token; every worker rejects it from then on until it expires"""
+    await services.tokens.revoke(db, credentials.credentials)
+    return Response(status_code=204)
@@ -1,39 +1,112 @@
 """Hospital routes"""
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Header, Response, Request, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 
-from app.models.hospital import Hospital
-from app.utils.distance import haversine_distance
-from app.database import db
+from app.models.hospital import Hospital, NearbyBatchRequest, NearbyBatchResult
+from app.config import NEARBY_QUERY_MODE
+from app.utils.geo import geo_near_pipeline
+from app.utils.bed_events import sse_stream
+from app.utils.responses import trusted_json
+from app.database import get_db
+from app.services import get_services
 
 router = APIRouter(prefix="/hospitals", tags=["hospitals"])
 
 @router.get("", response_model=List[Hospital])
-async def get_hospitals():
-    hospitals = await db.hospitals.find({}, {"_id": 0}).to_list(100)
-    return hospitals
+async def get_hospitals(if_none_match: Optional[str] = Header(None), db=Depends(get_db), services=Depends(get_services)):
+    """
+    Get all hospitals, served from a versioned in-process cache.
+    Responses carry a strong ETag and Last-Modified; a matching If-None-Match
+    gets 304 Not Modified with no body.
+    """
+    hospital_list_cache = services.hospital_list_cache
+    await hospital_list_cache.ensure_fresh(db)
+    headers = {
+        "ETag": hospital_list_cache.etag,
+        "Last-Modified": hospital_list_cache.last_modified,
+        "Cache-Control": "no-cache",
+    }
+    if hospital_list_cache.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=hospital_list_cache.body, media_type="application/json", headers=headers)
 
-@router.get("/nearby")
-async def get_nearby_hospitals(lat: float, lon: float, condition: Optional[str] = None):
+@router.get("/beds/stream")
+async def stream_bed_availability(request: Request, db=Depends(get_db), services=Depends(get_services)):
     """
-    Get nearby hospitals sorted by distance using Haversine formula.
-    Returns up to 10 hospitals, optionally filtered by bed availability.
+    Server-Sent Events stream of free-bed counts.
+    Sends a `snapshot` event with every hospital's count, then `beds` events
+    mapping hospital id to its new count whenever beds are reserved or released.
     """
-    hospitals = await db.hospitals.find({}, {"_id": 0}).to_list(100)
+    hospital_index, bed_events = services.hospital_index, services.bed_events
+    await hospital_index.ensure_fresh(db)
+    if bed_events.is_full:
+        raise HTTPException(status_code=503, detail="Too many bed availability subscribers")
     
-    # Calculate distance for each hospital using Haversine formula
-    for hospital in hospitals:
-        hospital['distance'] = haversine_distance(
-            lat, lon,
-            hospital['latitude'],
-            hospital['longitude']
-        )
+    def snapshot():
+        return {h['id']: h['available_beds'] for h in hospital_index.hospitals}
     
-    # Sort by distance
-    hospitals.sort(key=lambda x: x['distance'])
+    return StreamingResponse(
+        sse_stream(bed_events, snapshot, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/nearby")
+async def get_nearby_hospitals(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    condition: Optional[str] = None,
+    max_km: Optional[float] = Query(None, gt=0),
+    limit: int = Query(10, ge=1, le=50),
+    expertise: Optional[str] = None,
+    rank: str = Query("distance", pattern="^(distance|score|eta)$"),
+    db=Depends(get_db),
+    services=Depends(get_services),
+):
+    """
+    Get nearby hospitals sorted by distance using Haversine formula.
+    Returns up to `limit` hospitals (default 10), optionally filtered by radius and expertise.
+    - `condition` only restricts results to hospitals with free beds; it filters on expertise
+      in no rank mode (pass `expertise` for that)
+    - In "memory" mode distances are computed in one vectorized pass over the in-memory hospital index
+    - In "geonear" mode the query runs in MongoDB against the 2dsphere index
+    - rank=score orders by a weighted score of distance, free beds and whether the hospital
+      lists `condition` as an expertise, and adds a `score` breakdown (always served from memory)
+    - rank=eta orders by travel time from the precomputed travel-time table for the current
+      time of day, estimating from distance where it has no entry, and adds `eta_minutes`
+      and `eta_source` (always served from memory)
+    """
+    require_beds = bool(condition)
+    hospital_index = services.hospital_index
+    if rank in ("score", "eta"):
+        await hospital_index.ensure_fresh(db)
+        return trusted_json(hospital_index.nearest(lat, lon, limit, require_beds, max_km, expertise, rank, condition))
     
-    # Filter by bed availability if condition is specified
-    if condition:
-        hospitals = [h for h in hospitals if h['available_beds'] > 0]
+    if NEARBY_QUERY_MODE == "geonear":
+        pipeline = geo_near_pipeline(lat, lon, limit, max_km, require_beds, expertise)
+        return trusted_json(await db.hospitals.aggregate(pipeline).to_list(limit))
     
-    return hospitals[:10]
+    await hospital_index.ensure_fresh(db)
+    return trusted_json(hospital_index.nearest(lat, lon, limit, require_beds, max_km, expertise))
+
+@router.post("/nearby/batch", response_model=List[NearbyBatchResult])
+async def get_nearby_hospitals_batch(batch: NearbyBatchRequest, db=Depends(get_db), services=Depends(get_services)):
+    """
+    Get nearby hospitals for many incident locations in one request.
+    Results are returned in the same order as the submitted queries. The
+    incident-by-hospital distance matrix is computed in one vectorized pass
+    over the in-memory hospital index, whatever the nearby query mode.
+    """
+    hospital_index = services.hospital_index
+    await hospital_index.ensure_fresh(db)
+    ranked = hospital_index.nearest_many(
+        [(q.lat, q.lon, q.condition) for q in batch.queries],
+        limit=batch.limit,
+        max_km=batch.max_km,
+        rank=batch.rank,
+    )
+    return trusted_json([
+        {"lat": q.lat, "lon": q.lon, "condition": q.condition, "hospitals": hospitals}
+        for q, hospitals in zip(batch.queries, ranked)
+    ])
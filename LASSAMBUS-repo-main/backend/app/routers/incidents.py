@@ -1,81 +1,361 @@
 """Incident routes"""
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from pydantic import ValidationError
+from typing import List, Optional
 from datetime import datetime
 
-from app.models.incident import Incident, IncidentCreate, IncidentUpdate
-from app.utils.jwt import verify_token
-from app.database import db
+from app.models.incident import (
+    Incident, IncidentCreate, IncidentUpdate, IncidentSearchResult,
+    BulkIncidentItem, BulkIncidentRequest, BulkIncidentResult, BulkIncidentResponse
+)
+from app.utils.jwt import verify_token, verify_admin
+from app.utils.beds import reserve_bed, release_bed
+from app.utils.export import INCIDENT_EXPORT_FIELDS, ndjson_stream, csv_stream
+from app.utils.pagination import (
+    encode_cursor, decode_cursor, keyset_filter,
+    encode_search_cursor, decode_search_cursor, search_keyset_filter
+)
+from app.utils.responses import trusted_json, model_projection
+from app.indexes import INCIDENT_SORT
+from app.rollups import record_incidents_created, record_transfer_change
+from app.utils.rate_limit import rate_limit, user_or_ip_key, token_key
+from app.config import RATE_LIMIT_WRITE, RATE_LIMIT_BULK
+from app.database import get_db
+from app.services import get_services
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
-@router.post("", response_model=Incident)
-async def create_incident(incident_data: IncidentCreate, payload: dict = Depends(verify_token)):
-    user = await db.users.find_one({"id": payload["sub"]}, {"_id": 0})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+# Only the fields an Incident response exposes, so stored documents can be sent as they are
+INCIDENT_FIELDS = model_projection(Incident)
+
+async def resolve_personnel_name(db, services, payload: dict) -> str:
+    """Name of the submitting user, from the token claims or the profile cache"""
+    # Tokens minted with TOKEN_PROFILE_CLAIMS carry the name
+    personnel_name = payload.get("name")
+    if personnel_name is None:
+        user = await services.user_cache.profile(db, payload["sub"])
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        personnel_name = user['full_name']
+    return personnel_name
+
+@router.post("", response_model=Incident, dependencies=[Depends(rate_limit(RATE_LIMIT_WRITE, user_or_ip_key))])
+async def create_incident(
+    incident_data: IncidentCreate,
+    payload: dict = Depends(verify_token),
+    db=Depends(get_db),
+    services=Depends(get_services)
+):
+    try:
+        incident_data.resolve_lga(services.lga_resolver)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    personnel_name = await resolve_personnel_name(db, services, payload)
     
     incident_obj = Incident(
         **incident_data.model_dump(),
-        personnel_id=user['id'],
-        personnel_name=user['full_name']
+        personnel_id=payload["sub"],
+        personnel_name=personnel_name
     )
     
     doc = incident_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
-    await db.incidents.insert_one(doc)
-    return incident_obj
+    if incident_obj.transfer_to_hospital and incident_obj.hospital_id:
+        await reserve_bed(db, services, incident_obj.hospital_id)
+        doc['reserved_hospital_id'] = incident_obj.hospital_id
+    
+    try:
+        await db.incidents.insert_one(doc)
+    except Exception:
+        if doc.get('reserved_hospital_id'):
+            await release_bed(db, services, doc['reserved_hospital_id'])
+        raise
+    
+    await record_incidents_created(db, [doc])
+    return trusted_json(incident_obj.model_dump())
+
+# Each device flushes its own offline queue, so bulk sync is limited per login session
+@router.post("/bulk", response_model=BulkIncidentResponse,
+             dependencies=[Depends(rate_limit(RATE_LIMIT_BULK, token_key))])
+async def create_incidents_bulk(
+    batch: BulkIncidentRequest,
+    payload: dict = Depends(verify_token),
+    db=Depends(get_db),
+    services=Depends(get_services)
+):
+    """
+    Create up to 500 incidents queued offline, in one request.
+    - Each item is validated on its own; the response reports every item's outcome by index
+    - The submitter is resolved once and valid items are written with one unordered insert_many
+    - Items that reuse an existing `id` are reported as "duplicate", so replays are safe
+    - Transfers are recorded as reported; no bed is reserved for incidents synced after the fact
+    """
+    personnel_name = await resolve_personnel_name(db, services, payload)
+    
+    results: List[BulkIncidentResult] = []
+    docs = []
+    doc_indexes = []
+    for index, item in enumerate(batch.items):
+        try:
+            incident_data = BulkIncidentItem.model_validate(item)
+            incident_data.resolve_lga(services.lga_resolver)
+        except ValidationError as e:
+            # Errors from whole-item checks (such as latitude without longitude) have no field location
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error['loc'] else error['msg']
+                for error in e.errors()
+            )
+            results.append(BulkIncidentResult(index=index, status="invalid", error=message))
+            continue
+        except ValueError as e:
+            results.append(BulkIncidentResult(index=index, status="invalid", error=str(e)))
+            continue
+        
+        fields = incident_data.model_dump(exclude_none=True, exclude={"id", "created_at"})
+        overrides = incident_data.model_dump(include={"id", "created_at"}, exclude_none=True)
+        incident_obj = Incident(
+            **fields,
+            **overrides,
+            personnel_id=payload["sub"],
+            personnel_name=personnel_name
+        )
+        docs.append(incident_obj.model_dump())
+        doc_indexes.append(index)
+        results.append(BulkIncidentResult(index=index, status="created", id=incident_obj.id))
+    
+    if docs:
+        try:
+            await db.incidents.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            by_index = {result.index: result for result in results}
+            for error in e.details.get("writeErrors", []):
+                result = by_index[doc_indexes[error["index"]]]
+                if error.get("code") == 11000:
+                    result.status = "duplicate"
+                    result.error = "Incident already recorded"
+                else:
+                    result.status = "error"
+                    result.error = error.get("errmsg", "Write failed")
+    
+    created_indexes = {result.index for result in results if result.status == "created"}
+    await record_incidents_created(db, (doc for doc, index in zip(docs, doc_indexes) if index in created_indexes))
+    
+    created = len(created_indexes)
+    return trusted_json(
+        BulkIncidentResponse(created=created, failed=len(results) - created, results=results).model_dump()
+    )
 
 @router.get("", response_model=List[Incident])
 async def get_incidents(
+    after: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
-    payload: dict = Depends(verify_token)
+    payload: dict = Depends(verify_token),
+    db=Depends(get_db)
 ):
     """
-    Get incidents with pagination.
+    Get incidents with keyset pagination, newest first.
     - Personnel can only see their own incidents
     - Admins can see all incidents
+    - Pass the `X-Next-Cursor` response header back as `after` to fetch the next page;
+      the header is absent on the last page
+    - `skip` is still accepted for older clients but costs more the deeper the page
+    - Documents are projected to the response fields and sent without re-validation
     """
     query = {}
     if payload["role"] == "personnel":
         query["personnel_id"] = payload["sub"]
     
+    if after:
+        try:
+            created_at, incident_id = decode_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query.update(keyset_filter(created_at, incident_id))
+    
     # Validate pagination parameters
     skip = max(0, skip)
     limit = min(max(1, limit), 100)  # Limit between 1 and 100
     
-    incidents = await db.incidents.find(query, {"_id": 0})\
-        .sort("created_at", -1)\
-        .skip(skip)\
-        .limit(limit)\
-        .to_list(limit)
+    cursor = db.incidents.find(query, INCIDENT_FIELDS).sort(INCIDENT_SORT)
+    if skip and not after:
+        cursor = cursor.skip(skip)
+    # One extra row tells whether there is a next page without another query
+    incidents = await cursor.limit(limit + 1).to_list(limit + 1)
     
-    for incident in incidents:
-        if isinstance(incident['created_at'], str):
-            incident['created_at'] = datetime.fromisoformat(incident['created_at'])
+    headers = {}
+    if len(incidents) > limit:
+        del incidents[limit:]
+        last = incidents[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["id"])
     
-    return incidents
+    return trusted_json(incidents, headers=headers)
 
-@router.patch("/{incident_id}", response_model=Incident)
-async def update_incident(incident_id: str, update_data: IncidentUpdate, payload: dict = Depends(verify_token)):
-    incident = await db.incidents.find_one({"id": incident_id}, {"_id": 0})
-    if not incident:
-        raise HTTPException(status_code=404, detail="Incident not found")
+@router.get("/search", response_model=List[IncidentSearchResult])
+async def search_incidents(
+    q: str = Query(..., min_length=1, max_length=200),
+    lga: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    payload: dict = Depends(verify_token),
+    db=Depends(get_db)
+):
+    """
+    Full-text search over patient name, location and description, best matches first.
+    - Served by the `incident_text` index; patient name matches weigh most, then location
+    - Words are matched whole (any of them); put a phrase in double quotes to require it
+    - Personnel only find their own incidents, admins find all
+    - `start` (inclusive) and `end` (exclusive) filter on creation time
+    - Pass the `X-Next-Cursor` response header back as `after` for the next page
+    """
+    query = {"$text": {"$search": q}}
+    if payload["role"] == "personnel":
+        query["personnel_id"] = payload["sub"]
+    if lga:
+        query["lga"] = lga
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+    
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if after:
+        try:
+            score, created_at, incident_id = decode_search_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        pipeline.append({"$match": search_keyset_filter(score, created_at, incident_id)})
+    pipeline += [
+        {"$sort": {"score": -1, "created_at": -1, "id": -1}},
+        # One extra hit tells whether there is a next page
+        {"$limit": limit + 1},
+        {"$project": {**INCIDENT_FIELDS, "score": 1}},
+    ]
+    hits = await db.incidents.aggregate(pipeline).to_list(limit + 1)
+    
+    headers = {}
+    if len(hits) > limit:
+        del hits[limit:]
+        last = hits[-1]
+        headers["X-Next-Cursor"] = encode_search_cursor(last["score"], last["created_at"], last["id"])
+    
+    return trusted_json(hits, headers=headers)
+
+@router.get("/export")
+async def export_incidents(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    lga: Optional[str] = None,
+    personnel_id: Optional[str] = None,
+    batch_size: int = Query(1000, ge=100, le=5000),
+    payload: dict = Depends(verify_admin),
+    db=Depends(get_db)
+):
+    """
+    Stream matching incidents as NDJSON or CSV, oldest first (admin only).
+    Rows are read from the database cursor `batch_size` at a time and written out as
+    they arrive, so memory use does not grow with the number of matching incidents.
+    - `start` (inclusive) and `end` (exclusive) filter on creation time
+    """
+    query = {}
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+    if lga:
+        query["lga"] = lga
+    if personnel_id:
+        query["personnel_id"] = personnel_id
+    
+    cursor = db.incidents.find(query, {"_id": 0, "reserved_hospital_id": 0})\
+        .sort([(field, 1) for field, _ in INCIDENT_SORT])\
+        .batch_size(batch_size)
+    
+    if format == "csv":
+        stream = csv_stream(cursor, INCIDENT_EXPORT_FIELDS)
+        media_type = "text/csv"
+    else:
+        stream = ndjson_stream(cursor)
+        media_type = "application/x-ndjson"
+    
+    filename = f"incidents-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.patch("/{incident_id}", response_model=Incident,
+              dependencies=[Depends(rate_limit(RATE_LIMIT_WRITE, user_or_ip_key))])
+async def update_incident(
+    incident_id: str,
+    update_data: IncidentUpdate,
+    payload: dict = Depends(verify_token),
+    db=Depends(get_db),
+    services=Depends(get_services)
+):
+    """
+    Update an incident's transfer status in a single round-trip.
+    - Transferring to a hospital atomically reserves one of its beds (409 if none are free)
+    - Cancelling a transfer or moving it to another hospital releases the previous bed
+    - Re-sending a transfer to the hospital already holding the bed (e.g. a retried
+      request) keeps that bed, even if it was the hospital's last free one
+    """
+    target = update_data.hospital_id if update_data.transfer_to_hospital else None
     
     update_fields = {
         "transfer_to_hospital": update_data.transfer_to_hospital,
-        "hospital_id": update_data.hospital_id
+        "hospital_id": update_data.hospital_id,
+        "reserved_hospital_id": target
     }
+    projection = model_projection(Incident, "reserved_hospital_id")
     
-    await db.incidents.update_one(
-        {"id": incident_id},
-        {"$set": update_fields}
-    )
+    # The previous document tells us which bed, if any, to give back; the updated
+    # document is that plus the fields we just set
+    previous = None
+    if target:
+        # Only matches if this incident already holds a bed at the target
+        previous = await db.incidents.find_one_and_update(
+            {"id": incident_id, "reserved_hospital_id": target},
+            {"$set": update_fields},
+            projection=projection,
+            return_document=ReturnDocument.BEFORE
+        )
+    if previous is None:
+        # Reserve first so a full hospital rejects the transfer before the incident changes
+        if target:
+            await reserve_bed(db, services, target)
+        previous = await db.incidents.find_one_and_update(
+            {"id": incident_id},
+            {"$set": update_fields},
+            projection=projection,
+            return_document=ReturnDocument.BEFORE
+        )
+        if not previous:
+            if target:
+                await release_bed(db, services, target)
+            raise HTTPException(status_code=404, detail="Incident not found")
+        
+        previous_reservation = previous.get("reserved_hospital_id")
+        if previous_reservation:
+            # Includes the target itself if a concurrent request reserved it meanwhile
+            await release_bed(db, services, previous_reservation)
     
-    updated_incident = await db.incidents.find_one({"id": incident_id}, {"_id": 0})
-    if isinstance(updated_incident['created_at'], str):
-        updated_incident['created_at'] = datetime.fromisoformat(updated_incident['created_at'])
+    await record_transfer_change(db, previous, update_data.transfer_to_hospital)
     
-    return Incident(**updated_incident)
+    updated = {**previous, **update_fields}
+    del updated["reserved_hospital_id"]
+    return trusted_json(updated)
@@ -0,0 +1,45 @@
+"""Prometheus metrics route"""
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.config import METRICS_TOKEN
+from app.utils.metrics import registry, gauge_lines
+from app.services import get_services
+
+router = APIRouter(tags=["metrics"])
+
+def _app_metrics(services) -> str:
+    """Values of the app's own caches, streams and hashing pool (see app.services)"""
+    caches = {"user_profile": services.user_cache, "verified_token": services.tokens.cache}
+    hashing = services.passwords.metrics
+    ops = [(op,) for op in hashing]
+    lines = [
+        *gauge_lines("cache_hits_total", "Cache hits", {(name,): c.hits for name, c in caches.items()},
+                     ("cache",), "counter"),
+        *gauge_lines("cache_misses_total", "Cache misses", {(name,): c.misses for name, c in caches.items()},
+                     ("cache",), "counter"),
+        *gauge_lines("cache_entries", "Cache size", {(name,): len(c) for name, c in caches.items()}, ("cache",)),
+        *gauge_lines("bed_stream_subscribers", "Open bed availability streams",
+                     {(): len(services.bed_events.subscribers)}),
+        *gauge_lines("hospital_index_size", "Hospitals in the in-memory index",
+                     {(): len(services.hospital_index)}),
+        *gauge_lines("password_hash_calls_total", "bcrypt hash/verify calls",
+                     {op: hashing[op[0]]["count"] for op in ops}, ("op",), "counter"),
+        *gauge_lines("password_hash_seconds_total", "Time spent in bcrypt",
+                     {op: hashing[op[0]]["seconds_total"] for op in ops}, ("op",), "counter"),
+        *gauge_lines("password_hash_seconds_max", "Slowest bcrypt call",
+                     {op: hashing[op[0]]["seconds_max"] for op in ops}, ("op",)),
+        *gauge_lines("password_hash_rejected_total", "bcrypt calls rejected because the pool was full",
+                     {op: hashing[op[0]]["rejected"] for op in ops}, ("op",), "counter"),
+        *gauge_lines("password_hash_pending", "bcrypt calls queued or running",
+                     {(): services.passwords.pending}),
+    ]
+    return "\n".join(lines) + "\n"
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(request: Request, services=Depends(get_services)):
+    """Prometheus text exposition of request, database and runtime metrics"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    body = registry.render() + _app_metrics(services)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,85 @@
+"""
+Production launcher.
+
+    python -m app.serve [--workers N] [--port PORT]
+
+Runs uvicorn with one worker process per available CPU (or WEB_CONCURRENCY), using
+uvloop and httptools when they are installed. Workers are spawned fresh and open
+their own MongoDB client at startup. On SIGTERM each worker stops accepting
+connections, lets in-flight requests finish for up to GRACEFUL_SHUTDOWN_TIMEOUT
+seconds, then closes its MongoDB client and password-hashing pool.
+"""
+import argparse
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from app.config import (
+    WEB_CONCURRENCY, GRACEFUL_SHUTDOWN_TIMEOUT, RATE_LIMIT_STORAGE_URI, BED_EVENTS_CHANGE_STREAM
+)
+
+logger = logging.getLogger(__name__)
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring CPU affinity and a cgroup v2 quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def _warn_about_per_process_state(workers: int):
+    if workers < 2:
+        return
+    if RATE_LIMIT_STORAGE_URI.startswith(("memory://", "async+memory://")):
+        logger.warning(
+            f"Rate-limit counters are per process; with {workers} workers each limit is "
+            "effectively multiplied. Set RATE_LIMIT_STORAGE_URI to share them."
+        )
+    if not BED_EVENTS_CHANGE_STREAM:
+        logger.warning(
+            "Live bed events only see changes made by the same worker; set "
+            "BED_EVENTS_CHANGE_STREAM=true (replica set) to follow all workers."
+        )
+
+def _main():
+    parser = argparse.ArgumentParser(description="Run the LASAMBUS API with multiple workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY or available_cpus())
+    parser.add_argument("--graceful-timeout", type=int, default=GRACEFUL_SHUTDOWN_TIMEOUT)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    logger.info(f"Starting {args.workers} worker(s) on {args.host}:{args.port} (loop={loop}, http={http})")
+    _warn_about_per_process_state(args.workers)
+    
+    # An import string (not the app object) so each worker imports the app itself
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,47 @@
+"""In-memory state owned by one app"""
+from typing import Optional
+from fastapi import Request
+
+from app.config import Settings, RATE_LIMIT_STORAGE_URI
+from app.utils.bed_events import BedEventBroker
+from app.utils.hospital_cache import HospitalListCache
+from app.utils.hospital_index import HospitalIndex
+from app.utils.jwt import TokenVerifier
+from app.utils.lga_resolver import LgaResolver
+from app.utils.password import PasswordHasher
+from app.utils.rate_limit import RateLimiter
+from app.utils.user_cache import UserProfileCache
+
+class Services:
+    """
+    Caches, indexes, brokers and pools of one app. create_app builds one per app and
+    keeps it in `app.state.services`, so two apps in one process (e.g. in tests)
+    never see each other's tokens, hospitals, boundaries or subscribers.
+    """
+    
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.tokens = TokenVerifier(settings.jwt_secret)
+        self.user_cache = UserProfileCache()
+        self.hospital_index = HospitalIndex()
+        self.hospital_list_cache = HospitalListCache()
+        self.bed_events = BedEventBroker()
+        self.limiter = RateLimiter(RATE_LIMIT_STORAGE_URI)
+        self.passwords = PasswordHasher()
+        # LGA boundaries, loaded at startup; None when none are configured
+        self.lga_resolver: Optional[LgaResolver] = None
+    
+    def apply_bed_count(self, hospital_id: str, available_beds: int):
+        """Propagate a hospital's new free-bed count to the caches and subscribers"""
+        self.hospital_index.set_beds(hospital_id, available_beds)
+        self.hospital_list_cache.bump()
+        self.bed_events.publish(hospital_id, available_beds)
+    
+    def reload_hospitals(self):
+        """Make the hospital index and list cache reload on next use"""
+        self.hospital_index.invalidate()
+        self.hospital_list_cache.bump()
+
+def get_services(request: Request) -> Services:
+    """Route dependency: the services of the app serving the request"""
+    return request.app.state.services
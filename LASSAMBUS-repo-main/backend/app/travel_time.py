@@ -0,0 +1,227 @@
+"""
+Precomputed road travel times from map grid cells to hospitals.
+
+Straight-line distance is a poor guide in Lagos, where the lagoon, the bridges and
+traffic decide how long a trip takes. A travel-time table is built offline (for
+example from a routing engine run over sample origins) and ranks hospitals by ETA
+with a lookup instead of a routing call.
+
+A table is a directory:
+
+    meta.json    grid origin and cell size, time bands, UTC offset, hospital ids
+    cells.npy    int64, sorted ids of the grid cells the table covers
+    seconds.npy  uint16 [band, cell, hospital] travel seconds, 65535 where unknown
+
+The arrays are memory-mapped, so loading is immediate and only the rows that are
+looked up are ever read. To build one from a CSV of sampled trips with columns
+lat, lon, hospital_id, band, seconds, run from the backend directory:
+
+    python -m app.travel_time build trips.csv data/travel_times \\
+        --bands night:0-6,am_peak:6-10,midday:10-16,pm_peak:16-20,evening:20-24
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION = 1
+UNKNOWN = np.iinfo(np.uint16).max
+# Lagos State, padded; cells outside this box are never stored
+DEFAULT_BOUNDS = (6.35, 2.65, 6.75, 4.40)  # south, west, north, east
+DEFAULT_CELL_DEG = 0.01  # about 1.1 km
+DEFAULT_BANDS = [{"name": "all", "start_hour": 0, "end_hour": 24}]
+
+class TravelTimeTable:
+    """
+    Grid-cell to hospital travel times, by local time-of-day band.
+    
+    A lookup computes the cell id arithmetically, finds its row with a binary
+    search over the covered cells and reads one row of the memory-mapped array.
+    """
+    
+    def __init__(self, meta: dict, cells: np.ndarray, seconds: np.ndarray):
+        if meta.get("version") != TABLE_VERSION:
+            raise ValueError(f"Unsupported travel-time table version {meta.get('version')!r}")
+        self.meta = meta
+        self.cells = cells
+        self.seconds = seconds
+        self.south, self.west = meta["origin"]
+        self.cell_deg = meta["cell_deg"]
+        self.rows_count, self.cols_count = meta["grid_shape"]
+        self.utc_offset_hours = meta.get("utc_offset_hours", 1)
+        self.bands = meta["bands"]
+        self.hospital_ids: List[str] = meta["hospital_ids"]
+        if seconds.shape != (len(self.bands), len(cells), len(self.hospital_ids)):
+            raise ValueError(f"Travel-time array has shape {seconds.shape}, expected "
+                             f"{(len(self.bands), len(cells), len(self.hospital_ids))}")
+        self.hospital_columns = {hospital_id: j for j, hospital_id in enumerate(self.hospital_ids)}
+    
+        # Local hour -> band index
+        self.band_by_hour = np.zeros(24, dtype=np.int64)
+        for b, band in enumerate(self.bands):
+            self.band_by_hour[band["start_hour"]:band["end_hour"]] = b
+    
+    @classmethod
+    def load(cls, path) -> "TravelTimeTable":
+        path = Path(path)
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+        cells = np.load(path / "cells.npy", mmap_mode="r")
+        seconds = np.load(path / "seconds.npy", mmap_mode="r")
+        return cls(meta, cells, seconds)
+    
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "cells.npy", np.ascontiguousarray(self.cells, dtype=np.int64))
+        np.save(path / "seconds.npy", np.ascontiguousarray(self.seconds, dtype=np.uint16))
+        with open(path / "meta.json", "w") as f:
+            json.dump(self.meta, f)
+    
+    def cell_id(self, lat: float, lon: float) -> Optional[int]:
+        """Grid cell containing (lat, lon), or None outside the grid"""
+        row = math.floor((lat - self.south) / self.cell_deg)
+        col = math.floor((lon - self.west) / self.cell_deg)
+        if not (0 <= row < self.rows_count and 0 <= col < self.cols_count):
+            return None
+        return row * self.cols_count + col
+    
+    def band_at(self, when: Optional[datetime] = None) -> int:
+        """Index of the band covering `when` (default now) in the table's local time"""
+        when = when or datetime.now(timezone.utc)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        hour = (when.astimezone(timezone.utc).hour + self.utc_offset_hours) % 24
+        return int(self.band_by_hour[hour])
+    
+    def column_map(self, hospital_ids: Sequence[str]) -> np.ndarray:
+        """Table column for each of `hospital_ids`, -1 where the table has none"""
+        return np.array([self.hospital_columns.get(h, -1) for h in hospital_ids], dtype=np.int64)
+    
+    def lookup(self, lat: float, lon: float, columns: np.ndarray, band: int) -> Optional[np.ndarray]:
+        """
+        Travel seconds from (lat, lon) to the hospitals mapped by `columns`
+        (from column_map), as float64 with NaN where unknown; None if the
+        origin's cell is not in the table
+        """
+        cell = self.cell_id(lat, lon)
+        if cell is None:
+            return None
+        i = int(np.searchsorted(self.cells, cell))
+        if i == len(self.cells) or self.cells[i] != cell:
+            return None
+        row = self.seconds[band, i]
+        values = row[np.maximum(columns, 0)].astype(np.float64)
+        values[(columns < 0) | (values == UNKNOWN)] = np.nan
+        return values
+
+def parse_bands(spec: str) -> List[dict]:
+    """Parse "name:start-end,..." (local hours) into band definitions covering 0-24"""
+    bands = []
+    for part in spec.split(","):
+        name, _, hours = part.strip().partition(":")
+        start, _, end = hours.partition("-")
+        bands.append({"name": name, "start_hour": int(start), "end_hour": int(end)})
+    bands.sort(key=lambda band: band["start_hour"])
+    expected = 0
+    for band in bands:
+        if band["start_hour"] != expected or band["end_hour"] <= band["start_hour"]:
+            raise ValueError("Bands must be contiguous, non-empty and cover hours 0-24")
+        expected = band["end_hour"]
+    if expected != 24:
+        raise ValueError("Bands must be contiguous, non-empty and cover hours 0-24")
+    return bands
+
+def build_table(
+    trips: Iterable[Tuple[float, float, str, str, float]],
+    bands: List[dict] = DEFAULT_BANDS,
+    cell_deg: float = DEFAULT_CELL_DEG,
+    bounds: Tuple[float, float, float, float] = DEFAULT_BOUNDS,
+    utc_offset_hours: int = 1,
+) -> TravelTimeTable:
+    """
+    Build a table from (lat, lon, hospital_id, band_name, seconds) samples.
+    Samples falling in the same cell, band and hospital are averaged; trips
+    outside `bounds` or naming an unknown band are skipped.
+    """
+    south, west, north, east = bounds
+    grid_shape = [math.ceil((north - south) / cell_deg), math.ceil((east - west) / cell_deg)]
+    meta = {
+        "version": TABLE_VERSION,
+        "origin": [south, west],
+        "cell_deg": cell_deg,
+        "grid_shape": grid_shape,
+        "utc_offset_hours": utc_offset_hours,
+        "bands": bands,
+        "hospital_ids": [],
+    }
+    # Empty table used only for its cell arithmetic while collecting samples
+    grid = TravelTimeTable(meta, np.zeros(0, dtype=np.int64), np.zeros((len(bands), 0, 0), dtype=np.uint16))
+    band_index = {band["name"]: b for b, band in enumerate(bands)}
+    
+    sums = {}
+    hospital_ids = {}
+    skipped = 0
+    for lat, lon, hospital_id, band_name, seconds in trips:
+        cell = grid.cell_id(lat, lon)
+        band = band_index.get(band_name)
+        if cell is None or band is None:
+            skipped += 1
+            continue
+        column = hospital_ids.setdefault(hospital_id, len(hospital_ids))
+        total, count = sums.get((band, cell, column), (0.0, 0))
+        sums[(band, cell, column)] = (total + seconds, count + 1)
+    if skipped:
+        logger.warning(f"Skipped {skipped} trips outside the grid or with an unknown band")
+    
+    cells = np.array(sorted({cell for _, cell, _ in sums}), dtype=np.int64)
+    rows = {cell: i for i, cell in enumerate(cells.tolist())}
+    seconds = np.full((len(bands), len(cells), len(hospital_ids)), UNKNOWN, dtype=np.uint16)
+    for (band, cell, column), (total, count) in sums.items():
+        seconds[band, rows[cell], column] = min(round(total / count), UNKNOWN - 1)
+    
+    meta["hospital_ids"] = list(hospital_ids)
+    return TravelTimeTable(meta, cells, seconds)
+
+def read_trips(path) -> Iterable[Tuple[float, float, str, str, float]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield float(row["lat"]), float(row["lon"]), row["hospital_id"], row.get("band") or "all", float(row["seconds"])
+
+def _main() -> int:
+    parser = argparse.ArgumentParser(description="Build a travel-time table from sampled trips")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="build a table directory from a trips CSV")
+    build.add_argument("trips", type=Path, help="CSV with lat, lon, hospital_id, band, seconds")
+    build.add_argument("output", type=Path, help="directory to write the table to")
+    build.add_argument("--bands", default="all:0-24", help="name:start-end local hours, comma separated")
+    build.add_argument("--cell-deg", type=float, default=DEFAULT_CELL_DEG)
+    build.add_argument("--utc-offset", type=int, default=1, help="hours from UTC of the band times (WAT is 1)")
+    args = parser.parse_args()
+    
+    try:
+        bands = parse_bands(args.bands)
+        table = build_table(read_trips(args.trips), bands, args.cell_deg, utc_offset_hours=args.utc_offset)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Cannot build travel-time table: {e}")
+        return 1
+    table.save(args.output)
+    known = int((np.asarray(table.seconds) != UNKNOWN).sum())
+    logger.info(
+        f"Wrote {len(table.cells)} cells x {len(table.hospital_ids)} hospitals x {len(bands)} bands "
+        f"({known} known entries) to {args.output}"
+    )
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(_main())
@@ -0,0 +1,136 @@
+"""In-process pub/sub of hospital bed availability"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+
+from pymongo.errors import OperationFailure
+
+from app.config import BED_EVENTS_COALESCE_SECONDS, BED_EVENTS_MAX_SUBSCRIBERS
+
+logger = logging.getLogger(__name__)
+
+class BedSubscription:
+    """
+    One consumer's view of pending bed changes.
+    
+    Only the latest count per hospital is kept, so a slow consumer never builds a
+    queue: its backlog is bounded by the number of hospitals and it simply receives
+    the current value when it catches up.
+    """
+    
+    def __init__(self):
+        self.pending: Dict[str, int] = {}
+        self.ready = asyncio.Event()
+    
+    def offer(self, hospital_id: str, available_beds: int):
+        self.pending[hospital_id] = available_beds
+        self.ready.set()
+    
+    def drain(self) -> Dict[str, int]:
+        changes, self.pending = self.pending, {}
+        self.ready.clear()
+        return changes
+
+class BedEventBroker:
+    """Fans out absolute bed counts to every subscriber"""
+    
+    def __init__(self, max_subscribers: int = BED_EVENTS_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[BedSubscription] = set()
+    
+    @property
+    def is_full(self) -> bool:
+        return len(self.subscribers) >= self.max_subscribers
+    
+    def publish(self, hospital_id: str, available_beds: int):
+        """Announce a hospital's current free-bed count"""
+        for subscription in self.subscribers:
+            subscription.offer(hospital_id, available_beds)
+    
+    def subscribe(self) -> Optional[BedSubscription]:
+        """Register a subscriber, or return None if the subscriber limit is reached"""
+        if self.is_full:
+            return None
+        subscription = BedSubscription()
+        self.subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: BedSubscription):
+        self.subscribers.discard(subscription)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+async def sse_stream(
+    broker: BedEventBroker,
+    snapshot: Callable[[], Dict[str, int]],
+    is_disconnected,
+    coalesce_seconds: float = BED_EVENTS_COALESCE_SECONDS,
+    heartbeat_seconds: float = 15.0,
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for one subscriber: a `snapshot()` of every hospital's free beds,
+    then `beds` events holding only the hospitals that changed. Updates arriving within
+    `coalesce_seconds` of each other are merged into one event.
+    
+    The subscription is taken when the response starts iterating and dropped when it
+    stops, so a response that fails before sending anything holds no slot.
+    """
+    subscription = broker.subscribe()
+    if subscription is None:
+        yield _sse("error", {"detail": "Too many bed availability subscribers"})
+        return
+    try:
+        # Taken after subscribing, so no change can fall between the two
+        yield _sse("snapshot", snapshot())
+        while not await is_disconnected():
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            await asyncio.sleep(coalesce_seconds)
+            changes = subscription.drain()
+            if changes:
+                yield _sse("beds", changes)
+    finally:
+        broker.unsubscribe(subscription)
+
+async def watch_hospital_changes(db, on_beds, on_reload):
+    """
+    Follow the hospitals collection through a MongoDB change stream. Writes that only
+    touch `available_beds` call `on_beds(hospital_id, available_beds)`; any other
+    insert, update or replace (e.g. a registry sync from another process) also calls
+    `on_reload()` so cached hospital data is reloaded. Requires a replica set (a
+    single-node one is enough). Restarts after transient errors.
+    """
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+    while True:
+        try:
+            async with db.hospitals.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    document = change.get("fullDocument")
+                    if not document or "id" not in document:
+                        continue
+                    if not _beds_only(change):
+                        on_reload()
+                    on_beds(document["id"], document.get("available_beds", 0))
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == 40573:  # change streams need a replica set
+                logger.error("Hospital change stream disabled: MongoDB is not running as a replica set")
+                return
+            logger.warning(f"Hospital change stream interrupted, retrying: {e}")
+            await asyncio.sleep(5)
+        except Exception as e:
+            logger.warning(f"Hospital change stream interrupted, retrying: {e}")
+            await asyncio.sleep(5)
+
+def _beds_only(change: dict) -> bool:
+    """True for an update event that changed nothing but the free-bed count"""
+    if change.get("operationType") != "update":
+        return False
+    description = change.get("updateDescription") or {}
+    return set(description.get("updatedFields") or {}) <= {"available_beds"} and not description.get("removedFields")
@@ -0,0 +1,31 @@
+"""Atomic hospital bed reservation"""
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+async def reserve_bed(db, services, hospital_id: str):
+    """
+    Take one bed at a hospital with a conditional decrement, so it can never go below
+    zero. Raises 404 if the hospital does not exist and 409 if it has no free beds.
+    """
+    hospital = await db.hospitals.find_one_and_update(
+        {"id": hospital_id, "available_beds": {"$gt": 0}},
+        {"$inc": {"available_beds": -1}},
+        projection={"_id": 0, "available_beds": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if hospital is None:
+        if await db.hospitals.count_documents({"id": hospital_id}, limit=1) == 0:
+            raise HTTPException(status_code=404, detail="Hospital not found")
+        raise HTTPException(status_code=409, detail="No beds available at the selected hospital")
+    services.apply_bed_count(hospital_id, hospital["available_beds"])
+
+async def release_bed(db, services, hospital_id: str):
+    """Give back a bed previously taken with `reserve_bed`"""
+    hospital = await db.hospitals.find_one_and_update(
+        {"id": hospital_id},
+        {"$inc": {"available_beds": 1}},
+        projection={"_id": 0, "available_beds": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if hospital is not None:
+        services.apply_bed_count(hospital_id, hospital["available_beds"])
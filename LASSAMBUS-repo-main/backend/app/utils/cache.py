@@ -0,0 +1,93 @@
+"""In-process caching utilities"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after `ttl` seconds.
+    
+    Meant for use from a single event loop: `get_or_load` coalesces concurrent
+    loads of the same key into one call of the loader. Hit, miss and eviction
+    counts are kept for metrics.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or `default` if absent or expired"""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value; `ttl` overrides the cache-wide expiry for this entry"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key: Hashable):
+        """Drop the entry, and keep a load already in flight from storing its result"""
+        self._data.pop(key, None)
+        self._loading.pop(key, None)
+    
+    def clear(self):
+        self._data.clear()
+    
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value or load it. A loader result of None is not cached.
+        Concurrent callers for the same key share a single load.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            # Not stored if the key was invalidated while loading: the value may predate the change
+            if value is not None and self._loading.get(key) is future:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+    
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
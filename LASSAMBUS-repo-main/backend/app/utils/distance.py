@@ -1,6 +1,11 @@
 """Distance calculation utilities"""
 from math import radians, cos, sin, asin, sqrt
 
+import numpy as np
+
+# Radius of Earth in kilometers
+EARTH_RADIUS_KM = 6371
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate the great circle distance between two points on Earth (in kilometers)
@@ -22,7 +27,46 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * asin(sqrt(a))
     
-    # Radius of Earth in kilometers
-    R = 6371
+    return EARTH_RADIUS_KM * c
+
+def haversine_distances(lat: float, lon: float, lat_rad: np.ndarray, lon_rad: np.ndarray,
+                        cos_lat: np.ndarray = None) -> np.ndarray:
+    """
+    Vectorized Haversine distance from one point to many points (in kilometers).
+    
+    Args:
+        lat, lon: Latitude and longitude of the origin in degrees
+        lat_rad, lon_rad: Arrays of target latitudes and longitudes in radians
+        cos_lat: Optional precomputed cos(lat_rad) to skip one trigonometric pass
+    
+    Returns:
+        Array of distances in kilometers, aligned with the target arrays
+    """
+    lat1 = radians(lat)
+    lon1 = radians(lon)
+    if cos_lat is None:
+        cos_lat = np.cos(lat_rad)
+    
+    a = np.sin((lat_rad - lat1) / 2) ** 2 + cos(lat1) * cos_lat * np.sin((lon_rad - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def haversine_matrix(lats: np.ndarray, lons: np.ndarray, lat_rad: np.ndarray, lon_rad: np.ndarray,
+                     cos_lat: np.ndarray = None) -> np.ndarray:
+    """
+    Vectorized Haversine distances from many origins to many points (in kilometers).
+    
+    Args:
+        lats, lons: Arrays of origin latitudes and longitudes in degrees
+        lat_rad, lon_rad: Arrays of target latitudes and longitudes in radians
+        cos_lat: Optional precomputed cos(lat_rad)
+    
+    Returns:
+        Matrix of shape (len(lats), len(lat_rad)) of distances in kilometers
+    """
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+    if cos_lat is None:
+        cos_lat = np.cos(lat_rad)
     
-    return R * c
+    a = np.sin((lat_rad - lat1) / 2) ** 2 + np.cos(lat1) * cos_lat * np.sin((lon_rad - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
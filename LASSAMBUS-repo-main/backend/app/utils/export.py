@@ -0,0 +1,49 @@
+"""Streaming export utilities"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List
+
+# Incident columns, in CSV order
+INCIDENT_EXPORT_FIELDS = [
+    "id", "created_at", "personnel_id", "personnel_name", "patient_name", "patient_age",
+    "patient_sex", "location", "lga", "reported_lga", "description", "action_taken",
+    "transfer_to_hospital", "hospital_id", "latitude", "longitude",
+]
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def ndjson_stream(cursor, chunk_rows: int = 500) -> AsyncIterator[str]:
+    """Yield documents from an async cursor as NDJSON, `chunk_rows` lines per chunk"""
+    lines: List[str] = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, default=_json_default))
+        if len(lines) >= chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+async def csv_stream(cursor, fields: List[str], chunk_rows: int = 500) -> AsyncIterator[str]:
+    """Yield documents from an async cursor as CSV with a header row, `chunk_rows` rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    async for doc in cursor:
+        writer.writerow({
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in doc.items()
+        })
+        rows += 1
+        if rows >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue()
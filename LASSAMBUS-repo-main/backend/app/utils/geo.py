@@ -0,0 +1,52 @@
+"""GeoJSON and MongoDB geospatial query helpers"""
+import re
+from typing import List, Optional
+
+def geo_point(latitude: float, longitude: float) -> dict:
+    """Build a GeoJSON Point (MongoDB expects [longitude, latitude] order)"""
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+# Update pipeline that derives `location` from the stored latitude/longitude floats
+LOCATION_FROM_COORDINATES = [
+    {"$set": {"location": {"type": "Point", "coordinates": ["$longitude", "$latitude"]}}}
+]
+
+def hospital_filter(require_beds: bool = False, expertise: Optional[str] = None) -> dict:
+    """
+    Build the MongoDB filter for bed availability and expertise. Expertise matches a
+    whole tag ignoring case and surrounding spaces, as in the in-memory index.
+    """
+    query = {}
+    if require_beds:
+        query["available_beds"] = {"$gt": 0}
+    if expertise and expertise.strip():
+        query["expertise"] = {"$regex": f"^\\s*{re.escape(expertise.strip())}\\s*$", "$options": "i"}
+    return query
+
+def geo_near_pipeline(
+    lat: float,
+    lon: float,
+    limit: int = 10,
+    max_km: Optional[float] = None,
+    require_beds: bool = False,
+    expertise: Optional[str] = None,
+) -> List[dict]:
+    """
+    Build a `$geoNear` aggregation returning the nearest hospitals first,
+    with a `distance` field in kilometers. Requires a 2dsphere index on `location`.
+    """
+    geo_near = {
+        "near": geo_point(lat, lon),
+        "distanceField": "distance",
+        "distanceMultiplier": 0.001,  # meters -> kilometers
+        "spherical": True,
+        "query": hospital_filter(require_beds, expertise),
+    }
+    if max_km is not None:
+        geo_near["maxDistance"] = max_km * 1000
+    
+    return [
+        {"$geoNear": geo_near},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "location": 0}},
+    ]
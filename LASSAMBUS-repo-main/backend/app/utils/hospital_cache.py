@@ -0,0 +1,70 @@
+"""Versioned cache of the serialized hospital list"""
+import asyncio
+import hashlib
+import time
+from email.utils import formatdate
+from typing import Optional
+
+from app.config import HOSPITAL_INDEX_MAX_AGE
+from app.models.hospital import Hospital
+from app.utils.responses import dumps, model_projection
+
+HOSPITAL_FIELDS = model_projection(Hospital)
+
+class HospitalListCache:
+    """
+    Holds GET /api/hospitals as ready-to-send JSON bytes with a strong ETag.
+    
+    `bump()` must be called after any hospital write in this process; the body is
+    then rebuilt on the next request. Writes from other workers are picked up once
+    the entry is older than `max_age` seconds. The ETag is a hash of the body, so
+    every worker serving the same data hands out the same ETag.
+    """
+    
+    def __init__(self, max_age: float = HOSPITAL_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self.version = 0
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self._built_version = -1
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    @property
+    def is_stale(self) -> bool:
+        return (
+            self.body is None
+            or self._built_version != self.version
+            or time.monotonic() - self._built_at > self.max_age
+        )
+    
+    def bump(self):
+        """Record that hospital data changed"""
+        self.version += 1
+    
+    async def refresh(self, db):
+        version = self.version
+        hospitals = await db.hospitals.find({}, HOSPITAL_FIELDS).to_list(None)
+        body = dumps(hospitals)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        if etag != self.etag:
+            self.last_modified = formatdate(time.time(), usegmt=True)
+        self.body, self.etag = body, etag
+        self._built_version = version
+        self._built_at = time.monotonic()
+    
+    async def ensure_fresh(self, db):
+        """Rebuild the body if it is stale; concurrent callers share one rebuild"""
+        if not self.is_stale:
+            return
+        async with self._lock:
+            if self.is_stale:
+                await self.refresh(db)
+    
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header value matches the current ETag"""
+        if not if_none_match or self.etag is None:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags
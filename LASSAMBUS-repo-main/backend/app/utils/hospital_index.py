@@ -0,0 +1,252 @@
+"""In-memory hospital index for nearest-hospital lookups"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import HOSPITAL_INDEX_MAX_AGE, TRAVEL_FALLBACK_SPEED_KMH
+from app.models.hospital import RankingWeights
+from app.utils.distance import haversine_distances, haversine_matrix
+from app.utils.ranking import DEFAULT_RANKING_WEIGHTS, score_hospitals
+from app.travel_time import TravelTimeTable
+
+class HospitalIndex:
+    """
+    Process-local snapshot of the hospitals collection held in NumPy arrays.
+    
+    Coordinates are stored in radians (with cos(latitude) precomputed) so a lookup
+    is one batched Haversine pass plus a partial top-k selection. Expertise tags are
+    kept in an inverted index of boolean arrays (one per tag, case-insensitive) so
+    expertise filters and score components never loop over documents. Bed counts are
+    patched in place on reservations. The snapshot is reloaded on the next lookup after
+    `invalidate()`, which the hospital change stream calls for any other hospital
+    write (BED_EVENTS_CHANGE_STREAM), and otherwise once it is older than `max_age`
+    seconds.
+    
+    With a travel-time table attached, hospitals can also be ranked by ETA; hospitals
+    or origins the table does not cover get an estimate from the straight-line
+    distance at `fallback_speed_kmh`.
+    """
+    
+    def __init__(self, max_age: float = HOSPITAL_INDEX_MAX_AGE, fallback_speed_kmh: float = TRAVEL_FALLBACK_SPEED_KMH):
+        self.max_age = max_age
+        self.fallback_speed_kmh = fallback_speed_kmh
+        self.travel_table: Optional[TravelTimeTable] = None
+        self._lock = asyncio.Lock()
+        self._loaded_at: Optional[float] = None
+        self._set_hospitals([])
+    
+    def _set_hospitals(self, hospitals: List[dict]):
+        self.hospitals = hospitals
+        self.lat_rad = np.radians(np.array([h['latitude'] for h in hospitals], dtype=np.float64))
+        self.lon_rad = np.radians(np.array([h['longitude'] for h in hospitals], dtype=np.float64))
+        self.cos_lat = np.cos(self.lat_rad)
+        self.available_beds = np.array([h.get('available_beds', 0) for h in hospitals], dtype=np.int64)
+        self.positions = {h['id']: i for i, h in enumerate(hospitals)}
+        self.expertise_index: Dict[str, np.ndarray] = {}
+        for i, hospital in enumerate(hospitals):
+            for tag in hospital.get('expertise', []):
+                key = normalize_tag(tag)
+                if key not in self.expertise_index:
+                    self.expertise_index[key] = np.zeros(len(hospitals), dtype=bool)
+                self.expertise_index[key][i] = True
+        self._map_travel_columns()
+    
+    def _map_travel_columns(self):
+        # Travel-table column of each indexed hospital, -1 where the table has none
+        if self.travel_table is None:
+            self.travel_columns = np.full(len(self.hospitals), -1, dtype=np.int64)
+        else:
+            self.travel_columns = self.travel_table.column_map([h['id'] for h in self.hospitals])
+    
+    def set_travel_table(self, table: Optional[TravelTimeTable]):
+        """Attach (or with None, detach) the travel-time table used for rank=eta"""
+        self.travel_table = table
+        self._map_travel_columns()
+    
+    def __len__(self) -> int:
+        return len(self.hospitals)
+    
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age
+    
+    def invalidate(self):
+        """Mark the snapshot stale so the next lookup reloads it"""
+        self._loaded_at = None
+    
+    def set_beds(self, hospital_id: str, available_beds: int):
+        """Apply a known bed count without reloading the snapshot"""
+        i = self.positions.get(hospital_id)
+        if i is None:
+            return
+        self.available_beds[i] = available_beds
+        self.hospitals[i] = {**self.hospitals[i], "available_beds": available_beds}
+    
+    async def refresh(self, db):
+        """Reload every hospital from the database"""
+        hospitals = await db.hospitals.find({}, {"_id": 0, "location": 0}).to_list(None)
+        self._set_hospitals(hospitals)
+        self._loaded_at = time.monotonic()
+    
+    async def ensure_fresh(self, db):
+        """Reload the snapshot if it is stale; concurrent callers share one reload"""
+        if not self.is_stale:
+            return
+        async with self._lock:
+            if self.is_stale:
+                await self.refresh(db)
+    
+    def expertise_mask(self, tag: Optional[str]) -> np.ndarray:
+        """Boolean array marking hospitals that list `tag` as an expertise"""
+        mask = self.expertise_index.get(normalize_tag(tag)) if tag else None
+        if mask is None:
+            return np.zeros(len(self.hospitals), dtype=bool)
+        return mask
+    
+    def distances(self, lat: float, lon: float) -> np.ndarray:
+        """Distance in kilometers from a point to every indexed hospital"""
+        return haversine_distances(lat, lon, self.lat_rad, self.lon_rad, self.cos_lat)
+    
+    def distance_matrix(self, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+        """Distance in kilometers from each (lat, lon) origin (rows) to every indexed hospital (columns)"""
+        return haversine_matrix(lats, lons, self.lat_rad, self.lon_rad, self.cos_lat)
+    
+    def etas(self, lat: float, lon: float, distances: np.ndarray, when: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Minutes from (lat, lon) to every indexed hospital, and a boolean array marking
+        which came from the travel-time table rather than the distance estimate
+        """
+        minutes = distances * (60.0 / self.fallback_speed_kmh)
+        if self.travel_table is None or not (self.travel_columns >= 0).any():
+            return minutes, np.zeros(len(distances), dtype=bool)
+        seconds = self.travel_table.lookup(lat, lon, self.travel_columns, self.travel_table.band_at(when))
+        if seconds is None:
+            return minutes, np.zeros(len(distances), dtype=bool)
+        known = ~np.isnan(seconds)
+        minutes[known] = seconds[known] / 60.0
+        return minutes, known
+    
+    def _mask(
+        self,
+        distances: np.ndarray,
+        require_beds: bool = False,
+        max_km: Optional[float] = None,
+        expertise: Optional[str] = None,
+    ) -> np.ndarray:
+        mask = np.ones(len(distances), dtype=bool)
+        if require_beds:
+            mask &= self.available_beds > 0
+        if max_km is not None:
+            mask &= distances <= max_km
+        if expertise:
+            mask &= self.expertise_mask(expertise)
+        return mask
+    
+    def _ranked(
+        self,
+        distances: np.ndarray,
+        mask: np.ndarray,
+        limit: int,
+        rank: str = "distance",
+        condition: Optional[str] = None,
+        weights: RankingWeights = DEFAULT_RANKING_WEIGHTS,
+        etas: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> List[dict]:
+        candidates = np.flatnonzero(mask)
+        if rank == "eta":
+            minutes, known = etas
+            return [
+                {
+                    **self.hospitals[i],
+                    "distance": float(distances[i]),
+                    "eta_minutes": round(float(minutes[i]), 1),
+                    "eta_source": "table" if known[i] else "estimate",
+                }
+                for i in top_k(minutes, candidates, limit)
+            ]
+        if rank != "score":
+            return [
+                {**self.hospitals[i], "distance": float(distances[i])}
+                for i in top_k(distances, candidates, limit)
+            ]
+        
+        scores = score_hospitals(distances, self.available_beds, self.expertise_mask(condition), weights)
+        return [
+            {
+                **self.hospitals[i],
+                "distance": float(distances[i]),
+                "score": {name: float(values[i]) for name, values in scores.items()},
+            }
+            for i in top_k(-scores["total"], candidates, limit)
+        ]
+    
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        limit: int = 10,
+        require_beds: bool = False,
+        max_km: Optional[float] = None,
+        expertise: Optional[str] = None,
+        rank: str = "distance",
+        condition: Optional[str] = None,
+        weights: RankingWeights = DEFAULT_RANKING_WEIGHTS,
+        when: Optional[datetime] = None,
+    ) -> List[dict]:
+        """
+        Return up to `limit` hospitals closest to (lat, lon), nearest first.
+        Each result is a copy of the hospital document with a `distance` field in km.
+        With rank="score" hospitals are ordered by the composite score instead, which
+        weighs whether they list `condition` as an expertise (it never filters them out),
+        and each result carries a `score` breakdown.
+        With rank="eta" they are ordered by travel time at `when` (default now), and
+        each result carries `eta_minutes` and whether it came from the travel-time
+        table or the distance estimate (`eta_source`).
+        """
+        distances = self.distances(lat, lon)
+        mask = self._mask(distances, require_beds, max_km, expertise)
+        etas = self.etas(lat, lon, distances, when) if rank == "eta" else None
+        return self._ranked(distances, mask, limit, rank, condition, weights, etas)
+    
+    def nearest_many(
+        self,
+        points: Sequence[Tuple[float, float, Optional[str]]],
+        limit: int = 10,
+        max_km: Optional[float] = None,
+        rank: str = "distance",
+        weights: RankingWeights = DEFAULT_RANKING_WEIGHTS,
+    ) -> List[List[dict]]:
+        """
+        Rank hospitals for many (lat, lon, condition) origins at once; a condition
+        requires free beds, as in `nearest`. The full origin-by-hospital distance
+        matrix is computed in a single pass.
+        """
+        if not points:
+            return []
+        lats, lons, conditions = zip(*points)
+        matrix = self.distance_matrix(lats, lons)
+        return [
+            self._ranked(
+                row, self._mask(row, bool(condition), max_km), limit, rank, condition, weights,
+                self.etas(lat, lon, row) if rank == "eta" else None,
+            )
+            for row, lat, lon, condition in zip(matrix, lats, lons, conditions)
+        ]
+
+def normalize_tag(tag: str) -> str:
+    """Normalise an expertise tag or condition for index lookups"""
+    return tag.strip().casefold()
+
+def top_k(values: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """Indices from `candidates` with the k smallest `values`, in ascending order"""
+    if k <= 0 or len(candidates) == 0:
+        return candidates[:0]
+    candidate_values = values[candidates]
+    if k < len(candidates):
+        part = np.argpartition(candidate_values, k - 1)[:k]
+    else:
+        part = np.arange(len(candidates))
+    return candidates[part[np.argsort(candidate_values[part], kind="stable")]]
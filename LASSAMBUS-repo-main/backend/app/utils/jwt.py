@@ -1,47 +1,159 @@
 """JWT token utilities"""
+import asyncio
+import hashlib
+import logging
+import time
 import jwt
 from datetime import datetime, timezone, timedelta
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
-from app.config import JWT_SECRET, JWT_ALGORITHM
+from typing import Dict, Optional
+from pymongo.errors import PyMongoError
+from app.config import JWT_ALGORITHM, TOKEN_CACHE_TTL, TOKEN_CACHE_SIZE, TOKEN_REVOCATION_SYNC_SECONDS
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Revoked token digests shared by every worker; a TTL index drops each one once the
+# token has expired anyway (see app/indexes.py)
+REVOKED_TOKENS_COLLECTION = "revoked_tokens"
+
+# Revocations are re-read from this far before the last sync, so ones written by a
+# server whose clock runs a little behind are not missed
+REVOCATION_SYNC_OVERLAP = timedelta(seconds=60)
 
 security = HTTPBearer()
 security_optional = HTTPBearer(auto_error=False)
 
-def create_access_token(data: dict, expires_days: int = 7) -> str:
-    """Create a JWT access token"""
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=expires_days)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
-    return encoded_jwt
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Verify JWT token and return payload"""
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+class TokenVerifier:
+    """
+    Signs and verifies access tokens with one secret.
+    
+    Verified payloads are cached by token digest until the earlier of the cache TTL
+    and the token's `exp`; payloads are shared between requests, treat them as
+    read-only. The secret is fixed for the verifier's lifetime and each app has its
+    own verifier (see app.services), so a cached payload never outlives the secret
+    it was verified with: rotating JWT_SECRET means starting new apps.
+    
+    Revoked tokens are recorded in the `revoked_tokens` collection, so every worker
+    rejects them, and mirrored in `revoked`, which is never evicted; an entry is only
+    dropped once its token has expired. Revocations made by other workers are picked
+    up by `sync_revocations`, which the app runs every TOKEN_REVOCATION_SYNC_SECONDS.
+    """
+    
+    def __init__(self, secret: str, cache_size: int = TOKEN_CACHE_SIZE, cache_ttl: float = TOKEN_CACHE_TTL):
+        self._secret = secret
+        self.cache_ttl = cache_ttl
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # Digest of each revoked token -> its `exp` (inf if it has none)
+        self.revoked: Dict[str, float] = {}
+        self._synced_at: Optional[datetime] = None
+    
+    @property
+    def secret(self) -> str:
+        return self._secret
+    
+    def create(self, data: dict, expires_days: int = 7) -> str:
+        """Create a JWT access token"""
+        to_encode = data.copy()
+        expire = datetime.now(timezone.utc) + timedelta(days=expires_days)
+        to_encode.update({"exp": expire})
+        return jwt.encode(to_encode, self._secret, algorithm=JWT_ALGORITHM)
+    
+    def decode(self, token: str) -> dict:
+        """Verify a JWT and return its payload, raising 401 if it is invalid, expired or revoked"""
+        digest = _token_digest(token)
+        if digest in self.revoked:
+            raise HTTPException(status_code=401, detail="Token revoked")
+        
+        payload = self.cache.get(digest)
+        if payload is not None:
+            if payload.get("exp", float("inf")) > time.time():
+                return payload
+            self.cache.invalidate(digest)
+            raise HTTPException(status_code=401, detail="Token expired")
+        
+        try:
+            payload = jwt.decode(token, self._secret, algorithms=[JWT_ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token expired")
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        
+        ttl = self.cache_ttl
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            self.cache.set(digest, payload, ttl=ttl)
         return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    async def revoke(self, db, token: str):
+        """
+        Reject a valid token from now on, in every worker: at once in this one, and
+        within TOKEN_REVOCATION_SYNC_SECONDS in the others. Raises 401 if the token
+        is already invalid.
+        """
+        payload = self.decode(token)
+        digest = _token_digest(token)
+        exp = payload.get("exp")
+        await db[REVOKED_TOKENS_COLLECTION].update_one(
+            {"_id": digest},
+            {"$set": {
+                "revoked_at": datetime.now(timezone.utc),
+                # Without `exp` the token never expires, and neither does the entry
+                "expires_at": datetime.fromtimestamp(exp, timezone.utc) if exp else None,
+            }},
+            upsert=True
+        )
+        self.cache.invalidate(digest)
+        self.revoked[digest] = exp or float("inf")
+    
+    async def sync_revocations(self, db):
+        """Load revocations recorded since the last sync and forget expired ones"""
+        now = datetime.now(timezone.utc)
+        query = {"$or": [{"expires_at": {"$gt": now}}, {"expires_at": None}]}
+        if self._synced_at is not None:
+            query["revoked_at"] = {"$gte": self._synced_at - REVOCATION_SYNC_OVERLAP}
+        async for entry in db[REVOKED_TOKENS_COLLECTION].find(query, {"expires_at": 1}):
+            expires_at = entry.get("expires_at")
+            self.revoked[entry["_id"]] = expires_at.timestamp() if expires_at else float("inf")
+            self.cache.invalidate(entry["_id"])
+        self._synced_at = now
+        
+        expired = [digest for digest, exp in self.revoked.items() if exp <= now.timestamp()]
+        for digest in expired:
+            del self.revoked[digest]
+    
+    async def follow_revocations(self, db, interval: float = TOKEN_REVOCATION_SYNC_SECONDS):
+        """Run forever, syncing revocations every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync_revocations(db)
+            except PyMongoError as e:
+                logger.warning(f"Token revocations not synced, retrying in {interval}s: {e}")
 
-async def verify_token_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional)) -> Optional[dict]:
+def get_token_verifier(request: Request) -> TokenVerifier:
+    """The verifier of the app serving `request`"""
+    return request.app.state.services.tokens
+
+async def verify_token(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Verify JWT token and return payload"""
+    return get_token_verifier(request).decode(credentials.credentials)
+
+async def verify_token_optional(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional)
+) -> Optional[dict]:
     """Optionally verify JWT token and return payload, or None if no token provided"""
     if credentials is None:
         return None
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return get_token_verifier(request).decode(credentials.credentials)
 
-def verify_admin(payload: dict = Depends(verify_token)) -> dict:
+async def verify_admin(payload: dict = Depends(verify_token)) -> dict:
     """Verify that the authenticated user is an admin"""
     if payload.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -0,0 +1,146 @@
+"""Resolve coordinates to a Lagos LGA from boundary polygons"""
+import json
+import logging
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import LGA_BOUNDARIES_PATH, LGA_NAME_PROPERTY
+from app.utils.validation import get_valid_lgas
+
+logger = logging.getLogger(__name__)
+
+# Feature properties tried for the LGA name when LGA_NAME_PROPERTY is not present
+# (common names in public administrative-boundary datasets)
+NAME_PROPERTIES = ("lga", "LGA", "name", "NAME", "lga_name", "admin2Name", "ADM2_EN", "admin2Name_en")
+
+def _name_key(name: str) -> str:
+    return "".join(ch for ch in name.casefold() if ch.isalnum())
+
+_CANONICAL_LGAS = {_name_key(lga): lga for lga in get_valid_lgas()}
+
+class _Polygon:
+    """One polygon (outer ring plus holes) as vertex arrays, with its bounding box"""
+    
+    def __init__(self, lga: str, rings: List[np.ndarray]):
+        self.lga = lga
+        self.rings = rings
+        outer = rings[0]
+        self.west, self.south = outer.min(axis=0)
+        self.east, self.north = outer.max(axis=0)
+    
+    def contains(self, lon: float, lat: float) -> bool:
+        if not (self.west <= lon <= self.east and self.south <= lat <= self.north):
+            return False
+        inside = _in_ring(self.rings[0], lon, lat)
+        for hole in self.rings[1:]:
+            if inside and _in_ring(hole, lon, lat):
+                return False
+        return inside
+
+def _in_ring(ring: np.ndarray, lon: float, lat: float) -> bool:
+    """Even-odd ray casting over all edges of a closed ring at once"""
+    x0, y0 = ring[:-1, 0], ring[:-1, 1]
+    x1, y1 = ring[1:, 0], ring[1:, 1]
+    crosses = (y0 > lat) != (y1 > lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x0 + (lat - y0) * (x1 - x0) / (y1 - y0)
+    return bool(np.count_nonzero(crosses & (lon < x_at)) % 2)
+
+class LgaResolver:
+    """
+    Point-in-polygon lookup of LGAs.
+    
+    Polygons are bucketed into a uniform grid by bounding box, so a lookup computes
+    its cell, skips polygons whose box misses the point and runs the exact even-odd
+    test only on the one or two polygons left. Names are mapped to the spelling in
+    VALID_LAGOS_LGAS ignoring case and punctuation; features whose name matches none
+    of them are skipped, so every resolved LGA is a valid one.
+    """
+    
+    def __init__(self, polygons: List[_Polygon], cell_deg: float = 0.02):
+        self.polygons = polygons
+        self.cell_deg = cell_deg
+        self.lgas = sorted({polygon.lga for polygon in polygons})
+        if polygons:
+            self.west = min(p.west for p in polygons)
+            self.south = min(p.south for p in polygons)
+            east = max(p.east for p in polygons)
+            north = max(p.north for p in polygons)
+        else:
+            self.west = self.south = east = north = 0.0
+        self.cols = max(1, math.ceil((east - self.west) / cell_deg))
+        self.rows = max(1, math.ceil((north - self.south) / cell_deg))
+        self.cells: Dict[int, List[_Polygon]] = {}
+        for polygon in polygons:
+            row0, col0 = self._cell(polygon.south, polygon.west)
+            row1, col1 = self._cell(polygon.north, polygon.east)
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    self.cells.setdefault(row * self.cols + col, []).append(polygon)
+    
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = min(max(int((lat - self.south) // self.cell_deg), 0), self.rows - 1)
+        col = min(max(int((lon - self.west) // self.cell_deg), 0), self.cols - 1)
+        return row, col
+    
+    @classmethod
+    def from_geojson(cls, data: dict, name_property: Optional[str] = None, cell_deg: float = 0.02) -> "LgaResolver":
+        features = data.get("features") if data.get("type") == "FeatureCollection" else [data]
+        polygons = []
+        for feature in features:
+            properties = feature.get("properties") or {}
+            keys = ((name_property,) if name_property else ()) + NAME_PROPERTIES
+            name = next((properties[key] for key in keys if properties.get(key)), None)
+            geometry = feature.get("geometry") or {}
+            if not name or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+                continue
+            lga = _CANONICAL_LGAS.get(_name_key(str(name)))
+            if lga is None:
+                # Incidents must only ever be assigned valid LGAs
+                logger.warning(f"Skipping LGA boundary {name!r}: not one of the valid Lagos LGAs")
+                continue
+            parts = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+            for part in parts:
+                rings = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in part if len(ring) >= 4]
+                if rings:
+                    polygons.append(_Polygon(lga, rings))
+        return cls(polygons, cell_deg)
+    
+    @classmethod
+    def load(cls, path, name_property: Optional[str] = None) -> "LgaResolver":
+        with open(path) as f:
+            return cls.from_geojson(json.load(f), name_property)
+    
+    def resolve(self, lat: float, lon: float) -> Optional[str]:
+        """LGA containing (lat, lon), or None if the point is outside every boundary"""
+        if not self.polygons:
+            return None
+        row = int((lat - self.south) // self.cell_deg)
+        col = int((lon - self.west) // self.cell_deg)
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        for polygon in self.cells.get(row * self.cols + col, ()):
+            if polygon.contains(lon, lat):
+                return polygon.lga
+        return None
+
+def load_lga_resolver(path: Optional[str] = LGA_BOUNDARIES_PATH, name_property: Optional[str] = LGA_NAME_PROPERTY) -> Optional[LgaResolver]:
+    """
+    The resolver for the boundary file at `path` (default LGA_BOUNDARIES_PATH); None
+    when no file is configured or it cannot be read
+    """
+    path = Path(path) if path else None
+    if path and path.exists():
+        try:
+            resolver = LgaResolver.load(path, name_property)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"LGA boundaries not loaded from {path}: {e}")
+            return None
+        logger.info(f"Loaded {len(resolver.polygons)} LGA boundary polygons ({len(resolver.lgas)} LGAs)")
+        return resolver
+    if path:
+        logger.info(f"No LGA boundary file at {path}; incident LGAs are not resolved from coordinates")
+    return None
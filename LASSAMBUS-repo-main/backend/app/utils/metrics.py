@@ -0,0 +1,206 @@
+"""
+Request, database and runtime metrics in Prometheus text format.
+
+Metrics are kept per process. Every series carries a `worker` label (the process
+id), so with several workers each scrape reports the worker that answered, and
+its counters never appear to go backwards. Aggregate across workers in queries,
+e.g. sum by (route) (rate(http_requests_total[5m])).
+"""
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    # Read on each render: a forked worker must not report its parent's id
+    pairs = [f'worker="{os.getpid()}"']
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_text} {total}")
+                lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class Registry:
+    """Metrics plus callbacks that report values owned by other modules at scrape time"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+mongodb_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("collection", "command"), DB_BUCKETS
+))
+mongodb_command_failures = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands", ("collection", "command")
+))
+event_loop_lag = registry.register(Histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled event-loop wakeup and when it ran", (), DB_BUCKETS
+))
+
+def gauge_lines(name: str, documentation: str, samples: Dict[tuple, float], labelnames: Tuple[str, ...] = (),
+                kind: str = "gauge") -> List[str]:
+    """Render values read at scrape time, for collectors"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples.items():
+        lines.append(f"{name}{_format_labels(labelnames, labels)} {value}")
+    return lines
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and status per route template (e.g.
+    /api/incidents/{incident_id}), so label cardinality stays bounded.
+    Requests to `untimed_routes` (long-lived streams and downloads) are counted but
+    kept out of the latency histogram, where their duration would swamp real latency.
+    """
+
+    def __init__(self, app, untimed_routes: Iterable[str] = ()):
+        self.app = app
+        self.untimed_routes = frozenset(untimed_routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            if template not in self.untimed_routes:
+                http_request_duration.observe(time.perf_counter() - started, method, template)
+            http_requests_total.inc(method, template, str(status["code"]))
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every MongoDB command, bucketed by collection and command name"""
+
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        command = event.command
+        if event.command_name == "getMore":
+            collection = command.get("collection")
+        else:
+            collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "-"
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "-")
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        mongodb_command_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongodb_command_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongodb_command_failures.inc(collection, event.command_name)
+
+mongo_command_listener = MongoCommandListener()
+
+async def sample_event_loop_lag(interval: float = 0.5):
+    """Run forever, recording how late each `interval`-second sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, loop.time() - started - interval))
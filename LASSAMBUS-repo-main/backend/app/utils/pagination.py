@@ -0,0 +1,60 @@
+"""Keyset (cursor) pagination utilities"""
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Tuple, Union
+
+def _timestamp(created_at: Union[datetime, str]) -> str:
+    # Rows not yet converted by app.migrations still hold ISO strings
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.isoformat()
+
+def encode_cursor(created_at: Union[datetime, str], item_id: str) -> str:
+    """Encode the sort key of the last returned item as an opaque token"""
+    raw = json.dumps({"c": _timestamp(created_at), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    """Decode a token produced by `encode_cursor`; raises ValueError if it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["c"]), str(data["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+def keyset_filter(created_at: datetime, item_id: str) -> dict:
+    """Filter for items strictly after the cursor in (created_at desc, id desc) order"""
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": item_id}},
+        ]
+    }
+
+def encode_search_cursor(score: float, created_at: Union[datetime, str], item_id: str) -> str:
+    """Encode the sort key of the last search hit (relevance, then newest first)"""
+    raw = json.dumps({"s": score, "c": _timestamp(created_at), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_search_cursor(token: str) -> Tuple[float, datetime, str]:
+    """Decode a token produced by `encode_search_cursor`; raises ValueError if it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(data["s"]), datetime.fromisoformat(data["c"]), str(data["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+def search_keyset_filter(score: float, created_at: datetime, item_id: str) -> dict:
+    """Filter for hits strictly after the cursor in (score desc, created_at desc, id desc) order"""
+    return {
+        "$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "created_at": {"$lt": created_at}},
+            {"score": score, "created_at": created_at, "id": {"$lt": item_id}},
+        ]
+    }
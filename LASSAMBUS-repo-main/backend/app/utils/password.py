@@ -1,8 +1,14 @@
 """Password validation and hashing utilities"""
+import asyncio
 import re
-from passlib.context import CryptContext
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from fastapi import HTTPException
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib is imported on the first hash or verify, not at startup
+_pwd_context = None
 
 def validate_password_strength(password: str) -> str:
     """Validate password strength and return error message if invalid"""
@@ -20,10 +26,79 @@ def validate_password_strength(password: str) -> str:
         return "Password must contain at least one special character"
     return None
 
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
 def hash_password(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+class PasswordHasher:
+    """
+    bcrypt hashing pool of one app. bcrypt releases the GIL while hashing, so a small
+    thread pool runs hashes in parallel without blocking the event loop; calls beyond
+    `max_pending` are rejected with 503 rather than queued.
+    """
+    
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        # Hash/verify calls queued or running on the pool
+        self.pending = 0
+        # Per-operation timing: call count, total/max seconds spent hashing, rejected calls
+        self.metrics: Dict[str, Dict[str, float]] = {
+            op: {"count": 0, "seconds_total": 0.0, "seconds_max": 0.0, "rejected": 0}
+            for op in ("hash", "verify")
+        }
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+    
+    def _timed(self, op: str, func: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics = self.metrics[op]
+            metrics["count"] += 1
+            metrics["seconds_total"] += elapsed
+            metrics["seconds_max"] = max(metrics["seconds_max"], elapsed)
+    
+    async def _run(self, op: str, func: Callable, *args):
+        """Run a bcrypt call on the pool, rejecting it when too many are queued"""
+        if self.pending >= self.max_pending:
+            self.metrics[op]["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Authentication service busy, please retry shortly")
+        
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._timed, op, func, *args)
+        finally:
+            self.pending -= 1
+    
+    async def hash(self, password: str) -> str:
+        """Hash a password without blocking the event loop"""
+        return await self._run("hash", hash_password, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash without blocking the event loop"""
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+    
+    async def shutdown(self):
+        """Stop the pool once in-flight calls finish, waiting in a thread rather than on the event loop"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True)
@@ -0,0 +1,39 @@
+"""Composite hospital scoring"""
+from typing import Dict
+
+import numpy as np
+
+from app.config import RANKING_WEIGHT_DISTANCE, RANKING_WEIGHT_BEDS, RANKING_WEIGHT_EXPERTISE
+from app.models.hospital import RankingWeights
+
+DEFAULT_RANKING_WEIGHTS = RankingWeights(
+    distance=RANKING_WEIGHT_DISTANCE,
+    beds=RANKING_WEIGHT_BEDS,
+    expertise=RANKING_WEIGHT_EXPERTISE,
+)
+
+def score_hospitals(
+    distances: np.ndarray,
+    available_beds: np.ndarray,
+    expertise_match: np.ndarray,
+    weights: RankingWeights = DEFAULT_RANKING_WEIGHTS,
+) -> Dict[str, np.ndarray]:
+    """
+    Score hospitals in one vectorized pass (higher is better).
+    
+    Args:
+        distances: Distance in km to each hospital
+        available_beds: Free beds at each hospital
+        expertise_match: Boolean array, True where the hospital covers the condition
+        weights: Component weights and normalisation constants
+    
+    Returns:
+        Weighted `distance`, `beds` and `expertise` components plus their `total`
+    """
+    components = {
+        "distance": weights.distance / (1.0 + distances / weights.distance_scale_km),
+        "beds": weights.beds * np.minimum(np.maximum(available_beds, 0), weights.bed_saturation) / weights.bed_saturation,
+        "expertise": weights.expertise * expertise_match.astype(np.float64),
+    }
+    components["total"] = components["distance"] + components["beds"] + components["expertise"]
+    return components
@@ -1,12 +1,177 @@
 """Rate limiting utilities"""
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi import Request
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Callable, Optional
+from fastapi import HTTPException, Request
+from app.config import RATE_LIMIT_STORAGE_URI, RATE_LIMIT_STORAGE_TIMEOUT, RATE_LIMIT_BREAKER_SECONDS
 
-# Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
+
+def get_remote_address(request: Request) -> str:
+    return request.client.host if request.client else "127.0.0.1"
 
 def get_rate_limit_key(request: Request) -> str:
     """Get rate limit key from request (IP address)"""
-    return get_remote_address(request)
+    return f"ip:{get_remote_address(request)}"
+
+def _bearer_token(request: Request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+def user_or_ip_key(request: Request) -> str:
+    """
+    Key by authenticated user id, falling back to the client IP.
+    Staff behind one hospital NAT then get separate budgets once they are logged in.
+    """
+    token = _bearer_token(request)
+    if token:
+        try:
+            return f"user:{request.app.state.services.tokens.decode(token)['sub']}"
+        except (HTTPException, KeyError):
+            pass
+    return get_rate_limit_key(request)
+
+def token_key(request: Request) -> str:
+    """
+    Key by bearer token digest, falling back to the client IP.
+    Each login session (e.g. each device of one crew member) gets its own budget.
+    """
+    token = _bearer_token(request)
+    if token:
+        return f"token:{hashlib.sha256(token.encode()).hexdigest()[:32]}"
+    return get_rate_limit_key(request)
+
+class RateLimiter:
+    """
+    Fixed-window limits backed by the asyncio storages of the `limits` package, so
+    a round-trip to the counter store never blocks the event loop.
+    
+    Counters live in `storage_uri` so limits hold across workers. A store that
+    fails or takes longer than `timeout` seconds trips a circuit breaker: for the
+    next `breaker_seconds` this process counts in memory instead of waiting on the
+    store for every request, then tries the store again. `limits` and the storage
+    are only loaded on the first checked request, keeping imports cheap.
+    """
+    
+    def __init__(self, storage_uri: str = RATE_LIMIT_STORAGE_URI, timeout: float = RATE_LIMIT_STORAGE_TIMEOUT,
+                 breaker_seconds: float = RATE_LIMIT_BREAKER_SECONDS):
+        self.storage_uri = storage_uri
+        self.timeout = timeout
+        self.breaker_seconds = breaker_seconds
+        self.enabled = True
+        self._strategy = None
+        self._fallback = None
+        self._open_until = 0.0
+        self._parsed = {}
+    
+    def _load(self):
+        from limits.storage import storage_from_string
+        from limits.aio.strategies import FixedWindowRateLimiter
+        uri = self.storage_uri
+        if uri.startswith(("memory://", "async+memory://")):
+            self._strategy = self._memory_strategy()
+            return
+        # Plain "redis://" or "mongodb://" URIs name the same stores as their async forms
+        if not uri.startswith("async+"):
+            uri = f"async+{uri}"
+        # The redis scheme uses redis-py's asyncio client rather than coredis
+        options = {"implementation": "redispy"} if uri.startswith("async+redis") else {}
+        self._strategy = FixedWindowRateLimiter(storage_from_string(uri, **options))
+    
+    def _memory_strategy(self):
+        if self._fallback is None:
+            from limits.storage import storage_from_string
+            from limits.aio.strategies import FixedWindowRateLimiter
+            self._fallback = FixedWindowRateLimiter(storage_from_string("async+memory://"))
+        return self._fallback
+    
+    def _item(self, limit: str):
+        item = self._parsed.get(limit)
+        if item is None:
+            from limits import parse
+            item = self._parsed[limit] = parse(limit)
+        return item
+    
+    def _shared_strategy(self):
+        if self._strategy is None:
+            try:
+                self._load()
+            except Exception as e:
+                logger.error(f"Cannot use rate limit storage {self.storage_uri!r}, using in-memory counters: {e}")
+                self._strategy = self._memory_strategy()
+        return self._strategy
+    
+    async def _call(self, method: str, limit: str, scope: str, key: str):
+        """
+        Run `method` ("hit" or "test") of the shared strategy, or of the in-memory one
+        while the breaker is open. Returns the result and the strategy that answered.
+        """
+        item = self._item(limit)
+        strategy = self._shared_strategy()
+        if time.monotonic() < self._open_until:
+            strategy = self._memory_strategy()
+        if strategy is self._fallback:
+            return await getattr(strategy, method)(item, scope, key), strategy
+        try:
+            return await asyncio.wait_for(getattr(strategy, method)(item, scope, key), self.timeout), strategy
+        except Exception as e:
+            self._open_until = time.monotonic() + self.breaker_seconds
+            logger.warning(
+                f"Rate limit storage unavailable, using in-memory counters for {self.breaker_seconds:g}s: {e!r}"
+            )
+            strategy = self._memory_strategy()
+            return await getattr(strategy, method)(item, scope, key), strategy
+    
+    async def _reject(self, strategy, limit: str, scope: str, key: str):
+        item = self._item(limit)
+        try:
+            reset_at, _ = await asyncio.wait_for(strategy.get_window_stats(item, scope, key), self.timeout)
+        except Exception:
+            # Retry-After is only advice; a whole window is the longest wait
+            reset_at = time.time() + item.get_expiry()
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: {item}",
+            headers={"Retry-After": str(max(1, math.ceil(reset_at - time.time())))}
+        )
+    
+    async def hit(self, limit: str, scope: str, key: str):
+        """
+        Count one request for `key` against `limit`, raising 429 with Retry-After once
+        the window's budget is spent
+        """
+        if not self.enabled:
+            return
+        allowed, strategy = await self._call("hit", limit, scope, key)
+        if not allowed:
+            await self._reject(strategy, limit, scope, key)
+    
+    async def check(self, limit: str, scope: str, key: str):
+        """Raise 429 if `key` has spent its budget for `limit`, without counting a request"""
+        if not self.enabled:
+            return
+        allowed, strategy = await self._call("test", limit, scope, key)
+        if not allowed:
+            await self._reject(strategy, limit, scope, key)
+    
+    async def count(self, limit: str, scope: str, key: str):
+        """Count one event for `key` against `limit` without rejecting anything"""
+        if self.enabled:
+            await self._call("hit", limit, scope, key)
+
+def rate_limit(limit: str, key_func: Callable[[Request], str] = get_rate_limit_key,
+               scope: Optional[str] = None):
+    """
+    Route dependency enforcing `limit` per `key_func(request)` with the app's limiter.
+    Unless a `scope` is given, each route has its own budget (keyed by its path
+    template, not the concrete URL such as /incidents/<id>).
+    """
+    async def check_rate_limit(request: Request):
+        route = request.scope.get("route")
+        route_scope = scope or f"{request.method}:{getattr(route, 'path', request.url.path)}"
+        await request.app.state.services.limiter.hit(limit, route_scope, key_func(request))
+    
+    return check_rate_limit
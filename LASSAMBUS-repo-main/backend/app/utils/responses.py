@@ -0,0 +1,47 @@
+"""Fast JSON responses for trusted data"""
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Datetimes as RFC 3339 with a "Z" suffix (what Pydantic emits for UTC), naive ones
+# treated as UTC, NumPy scalars and arrays as plain numbers, non-string dict keys allowed
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes with orjson"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson; the app's default response class"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def trusted_json(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """
+    Respond with data that already has the shape of the route's response_model.
+    Returning a Response makes FastAPI skip response_model validation and
+    jsonable_encoder, so only use this for documents the app wrote itself and
+    read back through `model_projection`.
+    """
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+def model_projection(model: Type[BaseModel], *extra: str) -> Dict[str, int]:
+    """
+    MongoDB projection returning only the model's public fields (plus `extra`),
+    so a document read with it can be sent without validating it first
+    """
+    projection = {"_id": 0}
+    for name, field in model.model_fields.items():
+        if not field.exclude:
+            projection[name] = 1
+    for name in extra:
+        projection[name] = 1
+    return projection
@@ -0,0 +1,27 @@
+"""Cached user profile lookups"""
+from typing import Optional
+
+from app.config import USER_CACHE_SIZE, USER_CACHE_TTL
+from app.utils.cache import TTLCache
+
+USER_PROFILE_PROJECTION = {"_id": 0, "password": 0}
+
+class UserProfileCache(TTLCache):
+    """
+    User id -> profile document (never includes the password hash).
+    
+    Code that writes a user document must call `invalidate(user_id)` afterwards;
+    registration is the only such write in the app. Changes made elsewhere (another
+    worker, a migration, the mongo shell) are not seen until the entry expires, so
+    profiles can be up to USER_CACHE_TTL seconds stale.
+    """
+    
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        super().__init__(maxsize, ttl)
+    
+    async def profile(self, db, user_id: str) -> Optional[dict]:
+        """Return the user's profile from the cache, loading it from the database on a miss"""
+        return await self.get_or_load(
+            user_id,
+            lambda: db.users.find_one({"id": user_id}, USER_PROFILE_PROJECTION),
+        )
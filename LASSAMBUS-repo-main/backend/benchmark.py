@@ -0,0 +1,295 @@
+"""
+In-process load test for the LASAMBUS API.
+
+Drives an app from `app.main.create_app` through an ASGI transport (no network, no uvicorn) against a
+local MongoDB or an in-memory stand-in, seeds it with generated data, runs
+concurrent scenarios and prints per-scenario latency percentiles and throughput
+as JSON so results can be compared between commits.
+
+Examples (from the backend directory):
+
+    python benchmark.py --in-memory --hospitals 1000 --incidents 20000
+    python benchmark.py --mongo-url mongodb://localhost:27017 --hospitals 10000 --incidents 1000000
+    python benchmark.py --scenarios nearby,paging --requests 5000 --concurrency 64 --output bench.json
+
+The database named by --db-name is dropped before seeding; never point it at real data.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# Lagos State bounding box used to generate coordinates
+LAT_RANGE = (6.38, 6.70)
+LON_RANGE = (2.70, 4.35)
+EXPERTISE = ["Emergency", "Trauma", "Surgery", "Cardiology", "Pediatrics", "Obstetrics", "Neurology"]
+PASSWORD = "Bench-Passw0rd!"
+SCENARIOS = ("login", "create_incident", "nearby", "paging")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="lasambus_bench")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock-motor instead of MongoDB")
+    parser.add_argument("--hospitals", type=int, default=10_000)
+    parser.add_argument("--incidents", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2_000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="leave rate limits enabled")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+def benchmark_settings(args):
+    from app.config import Settings
+    return Settings(
+        mongo_url=args.mongo_url,
+        db_name=args.db_name,
+        jwt_secret=os.environ.get("JWT_SECRET", "benchmark-secret"),
+    )
+
+def open_database(args, settings):
+    """Returns (database, client to close or None)"""
+    if args.in_memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--in-memory needs mongomock-motor: pip install mongomock-motor")
+        return AsyncMongoMockClient()[args.db_name], None
+
+    from app.database import create_client
+    client = create_client(settings)
+    return client[args.db_name], client
+
+async def seed(db, args, rng: random.Random):
+    """Drop the benchmark database contents and insert generated users, hospitals and incidents"""
+    from app.utils.geo import geo_point
+    from app.utils.password import hash_password
+    from app.utils.validation import get_valid_lgas
+
+    for name in ("users", "hospitals", "incidents", "incident_rollups"):
+        await db[name].drop()
+
+    lgas = get_valid_lgas()
+    password_hash = hash_password(PASSWORD)
+    now = datetime.now(timezone.utc)
+
+    users = [
+        {
+            "id": str(uuid.uuid4()),
+            "email": f"crew{i}@bench.lasambus.test",
+            "full_name": f"Crew Member {i}",
+            "role": "admin" if i == 0 else "personnel",
+            "password": password_hash,
+            "created_at": now,
+        }
+        for i in range(args.users)
+    ]
+    await db.users.insert_many(users)
+
+    hospitals = []
+    for i in range(args.hospitals):
+        lat = rng.uniform(*LAT_RANGE)
+        lon = rng.uniform(*LON_RANGE)
+        hospitals.append({
+            "id": f"bench-hosp-{i}",
+            "name": f"Facility {i}",
+            "address": f"{i} Bench Road",
+            "lga": rng.choice(lgas),
+            "available_beds": rng.randint(0, 60),
+            "expertise": rng.sample(EXPERTISE, rng.randint(1, 4)),
+            "phone": "01-000-0000",
+            "latitude": lat,
+            "longitude": lon,
+            "location": geo_point(lat, lon),
+        })
+    for start in range(0, len(hospitals), 10_000):
+        await db.hospitals.insert_many(hospitals[start:start + 10_000])
+
+    batch = []
+    for i in range(args.incidents):
+        user = users[rng.randrange(len(users))]
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "patient_name": f"Patient {i}",
+            "patient_age": rng.randint(0, 95),
+            "patient_sex": rng.choice(["Male", "Female"]),
+            "location": f"Street {i}",
+            "lga": rng.choice(lgas),
+            "description": "Generated benchmark incident description",
+            "action_taken": "Generated benchmark action taken",
+            "transfer_to_hospital": False,
+            "hospital_id": None,
+            "personnel_id": user["id"],
+            "personnel_name": user["full_name"],
+            "created_at": now - timedelta(seconds=rng.randint(0, 180 * 86400)),
+        })
+        if len(batch) == 10_000:
+            await db.incidents.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.incidents.insert_many(batch, ordered=False)
+
+    return users
+
+def summarize(latencies, statuses, duration):
+    latencies_ms = np.array(latencies) * 1000
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1) if duration else None,
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+    }
+
+async def run_scenario(client, make_request, total: int, concurrency: int):
+    """Issue `total` requests from `concurrency` workers; returns the latency summary"""
+    latencies = []
+    statuses = {}
+    remaining = iter(range(total))
+
+    async def worker(worker_id: int):
+        state = {}
+        for i in remaining:
+            started = time.perf_counter()
+            response = await make_request(client, i, state)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+def build_scenarios(users, tokens, rng: random.Random):
+    from app.utils.validation import get_valid_lgas
+    lgas = get_valid_lgas()
+    personnel_tokens = tokens[1:] or tokens
+    admin_headers = {"Authorization": f"Bearer {tokens[0]}"}
+
+    async def login(client, i, state):
+        user = users[i % len(users)]
+        return await client.post("/api/auth/login", json={"email": user["email"], "password": PASSWORD})
+
+    async def create_incident(client, i, state):
+        token = personnel_tokens[i % len(personnel_tokens)]
+        return await client.post(
+            "/api/incidents",
+            headers={"Authorization": f"Bearer {token}"},
+            json={
+                "patient_name": f"Bench Patient {i}",
+                "patient_age": 30,
+                "patient_sex": "Female",
+                "location": "Benchmark Street",
+                "lga": lgas[i % len(lgas)],
+                "description": "Benchmark incident description",
+                "action_taken": "Benchmark action taken",
+            },
+        )
+
+    async def nearby(client, i, state):
+        params = {"lat": rng.uniform(*LAT_RANGE), "lon": rng.uniform(*LON_RANGE)}
+        if i % 2:
+            params["condition"] = "cardiology"
+        return await client.get("/api/hospitals/nearby", params=params)
+
+    async def paging(client, i, state):
+        # Each worker walks deeper through the admin listing, restarting at the end
+        params = {"limit": 50}
+        if state.get("after"):
+            params["after"] = state["after"]
+        response = await client.get("/api/incidents", params=params, headers=admin_headers)
+        state["after"] = response.headers.get("x-next-cursor")
+        return response
+
+    return {"login": login, "create_incident": create_incident, "nearby": nearby, "paging": paging}
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main(argv=None):
+    args = parse_args(argv)
+    # Benchmark hospitals come from seed(); keep the registry file out of the dataset
+    os.environ["HOSPITAL_REGISTRY_SYNC"] = "false"
+
+    import httpx
+    from app.main import create_app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    rng = random.Random(args.seed)
+    settings = benchmark_settings(args)
+    db, client = open_database(args, settings)
+    app = create_app(settings, database=db)
+    services = app.state.services
+    if not args.keep_rate_limits:
+        services.limiter.enabled = False
+
+    seed_started = time.perf_counter()
+    users = await seed(db, args, rng)
+    seed_seconds = time.perf_counter() - seed_started
+    tokens = [services.tokens.create({"sub": u["id"], "email": u["email"], "role": u["role"]}) for u in users]
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "backend": "mongomock" if args.in_memory else "mongodb",
+            "hospitals": args.hospitals,
+            "incidents": args.incidents,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rate_limits": args.keep_rate_limits,
+        },
+        "seed_s": round(seed_seconds, 3),
+        "scenarios": {},
+    }
+    try:
+        # Run the app's lifespan (index creation, hospital index load) around the scenarios
+        async with app.router.lifespan_context(app):
+            scenarios = build_scenarios(users, tokens, rng)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+                for name in selected:
+                    report["scenarios"][name] = await run_scenario(
+                        http, scenarios[name], args.requests, args.concurrency
+                    )
+    finally:
+        if client is not None:
+            client.close()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    asyncio.run(main())
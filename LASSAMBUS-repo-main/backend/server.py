@@ -2,7 +2,12 @@
 Backward compatibility entry point.
 This file imports from the new modular structure.
 For new deployments, use: uvicorn app.main:app
+In production, run `python -m app.serve` (or `python server.py`) to start one worker per CPU.
 """
 from app.main import app
 
 __all__ = ["app"]
+
+if __name__ == "__main__":
+    from app.serve import _main
+    _main()
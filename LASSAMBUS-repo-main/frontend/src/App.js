@@ -4,6 +4,7 @@ import { Toaster } from '@/components/ui/sonner';
 import Login from '@/pages/Login';
 import PersonnelDashboard from '@/pages/PersonnelDashboard';
 import AdminDashboard from '@/pages/AdminDashboard';
+import { authAPI } from '@/lib/api';
 import '@/App.css';
 
 function App() {
@@ -27,6 +28,12 @@ function App() {
   };
 
   const handleLogout = () => {
+    // Revoke the token on the server too; sign out locally even if that fails
+    if (token) {
+      authAPI.logout(token).catch((error) => {
+        console.warn('Token not revoked on the server', error);
+      });
+    }
     setToken(null);
     setUser(null);
     localStorage.removeItem('token');
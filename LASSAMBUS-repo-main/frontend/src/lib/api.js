@@ -57,6 +57,11 @@ export const authAPI = {
   
   register: (userData) =>
     api.post('/auth/register', userData).then((res) => res.data),
+  
+  // The token is passed in rather than read by the interceptor, which runs after the
+  // caller has already cleared it from localStorage
+  logout: (token) =>
+    api.post('/auth/logout', null, { headers: { Authorization: `Bearer ${token}` } }),
 };
 
 // Incidents API
@@ -67,6 +72,13 @@ export const incidentsAPI = {
   getAll: (params = {}) =>
     api.get('/incidents', { params }).then((res) => res.data),
   
+  // Keyset pagination: pass nextCursor back as `after` until it is null
+  getPage: (params = {}) =>
+    api.get('/incidents', { params }).then((res) => ({
+      data: res.data,
+      nextCursor: res.headers['x-next-cursor'] || null,
+    })),
+  
   update: (incidentId, updateData) =>
     api.patch(`/incidents/${incidentId}`, updateData).then((res) => res.data),
 };
@@ -43,15 +43,14 @@ export default function AdminDashboard({ user, token, onLogout }) {
       // Fetch all incidents (we'll paginate client-side after filtering)
       // In production, you'd want server-side pagination with filters
       let allData = [];
-      let skip = 0;
-      let hasMore = true;
+      let after = null;
       
-      while (hasMore) {
-        const data = await incidentsAPI.getAll({ skip, limit: 100 });
+      do {
+        const params = after ? { after, limit: 100 } : { limit: 100 };
+        const { data, nextCursor } = await incidentsAPI.getPage(params);
         allData = [...allData, ...data];
-        hasMore = data.length === 100;
-        skip += 100;
-      }
+        after = nextCursor;
+      } while (after);
       
       setAllIncidents(allData);
     } catch (error) {
@@ -0,0 +1,92 @@
+"""
+Shared pytest setup: makes the backend's `app` package importable, builds apps on an
+in-memory database and provides the MongoDB server used by the integration tests.
+
+Set TEST_MONGO_URL (default mongodb://localhost:27017) to a server the tests may
+create and drop scratch databases on; tests that need it are skipped when none is
+reachable. Change-stream tests also need that server to be a replica set (a
+single-node one started with `mongod --replSet rs0` and `rs.initiate()` is enough).
+"""
+import os
+import sys
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+
+@lru_cache(maxsize=None)
+def _server_hello() -> Optional[dict]:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    client = MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        return client.admin.command("hello")
+    except PyMongoError:
+        return None
+    finally:
+        client.close()
+
+def make_app(jwt_secret: str = "test-secret", database=None):
+    """
+    A new app on `database`, by default its own empty in-memory database (needs
+    mongomock-motor). Apps given the same database behave like workers of one deployment.
+    """
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from app.config import Settings
+    from app.main import create_app
+    settings = Settings(mongo_url="mongodb://unused", db_name="test", jwt_secret=jwt_secret)
+    if database is None:
+        database = mongomock_motor.AsyncMongoMockClient()["test"]
+    return create_app(settings, database=database)
+
+def auth_headers(app, user_id: str = "user-1", role: str = "personnel", name: str = "Crew Member") -> dict:
+    """Bearer header with a token `app` accepts; the name claim spares a profile lookup"""
+    token = app.state.services.tokens.create({
+        "sub": user_id, "email": f"{user_id}@example.com", "role": role, "name": name,
+    })
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def app():
+    """An app on an in-memory database, with its own caches and rate limits"""
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    """Test client of `app`, with the lifespan (indexes, hospital index) run"""
+    from fastapi.testclient import TestClient
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def mongo_url() -> str:
+    """URL of the test MongoDB server; skips the test if there is none"""
+    if _server_hello() is None:
+        pytest.skip(f"no MongoDB at {TEST_MONGO_URL}")
+    return TEST_MONGO_URL
+
+@pytest.fixture
+def replica_set_url(mongo_url) -> str:
+    """URL of the test MongoDB server if it is a replica set; skips the test otherwise"""
+    if "setName" not in _server_hello():
+        pytest.skip(f"MongoDB at {TEST_MONGO_URL} is not a replica set")
+    return mongo_url
+
+async def with_scratch_db(url: str, check):
+    """Run `await check(db)` on a new database that is dropped afterwards"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(url, tz_aware=True)
+    name = f"lasambus_test_{uuid.uuid4().hex[:12]}"
+    try:
+        return await check(client[name])
+    finally:
+        await client.drop_database(name)
+        client.close()
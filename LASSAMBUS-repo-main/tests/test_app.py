@@ -0,0 +1,128 @@
+"""App factory: each app keeps its own state; incident listing pages"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from tests.conftest import make_app, auth_headers
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+def test_apps_do_not_share_state():
+    first, second = make_app(), make_app()
+    services = first.state.services
+    assert services is not second.state.services
+    
+    services.hospital_index.set_beds("hosp-1", 3)
+    services.tokens.cache.set("digest", {"sub": "user-1"})
+    assert len(second.state.services.tokens.cache) == 0
+    assert second.state.services.hospital_index is not services.hospital_index
+
+def test_token_is_only_accepted_by_the_app_with_its_secret():
+    issuer, other = make_app("secret-a"), make_app("secret-b")
+    token = issuer.state.services.tokens.create({"sub": "admin-1", "email": "a@example.com", "role": "admin"})
+    
+    with TestClient(issuer) as client:
+        assert client.get("/api/incidents", headers=_auth(token)).status_code == 200
+    with TestClient(other) as client:
+        response = client.get("/api/incidents", headers=_auth(token))
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid token"
+
+def test_shutdown_awaits_background_tasks_and_stops_the_hashing_pool(monkeypatch):
+    import app.main as main
+    stopped = []
+    
+    async def background_task():
+        try:
+            await asyncio.Event().wait()
+        finally:
+            # Cleanup that takes a while, like closing a change stream
+            await asyncio.sleep(0.05)
+            stopped.append("task")
+    
+    monkeypatch.setattr(main, "sample_event_loop_lag", background_task)
+    app = make_app()
+    passwords = app.state.services.passwords
+    shutdown = passwords.shutdown
+    
+    async def record_shutdown():
+        stopped.append("pool")
+        await shutdown()
+    
+    monkeypatch.setattr(passwords, "shutdown", record_shutdown)
+    with TestClient(app) as client:
+        assert client.portal.call(passwords.hash, "Correct-Horse-1")
+        assert passwords._executor is not None
+    # Cancelled tasks have finished before the rest of the shutdown
+    assert stopped == ["task", "pool"]
+    assert passwords._executor is None
+    assert passwords is not make_app().state.services.passwords
+
+def test_client_fixture_serves_hospitals(client):
+    response = client.get("/api/hospitals")
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert len(response.json()) == len(client.app.state.services.hospital_index)
+
+def _incident(incident_id: str, created_at: datetime, personnel_id: str = "user-1") -> dict:
+    return {
+        "id": incident_id, "patient_name": "Patient", "patient_sex": "Male", "location": "Allen Avenue",
+        "lga": "Ikeja", "description": "Collapsed at a bus stop", "action_taken": "Oxygen given on scene",
+        "transfer_to_hospital": False, "personnel_id": personnel_id, "personnel_name": "Crew Member",
+        "created_at": created_at,
+    }
+
+def _pages(client, headers: dict, limit: int):
+    """Every page of GET /api/incidents, following X-Next-Cursor"""
+    pages, params = [], {"limit": limit}
+    while True:
+        response = client.get("/api/incidents", params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append([incident["id"] for incident in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        params = {"limit": limit, "after": cursor}
+
+def test_pages_through_incidents_sharing_a_timestamp(client):
+    noon = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    # Five incidents at the same instant, between an older and a newer one
+    docs = [_incident(f"inc-{i}", noon) for i in range(5)]
+    docs += [_incident("inc-newest", noon + timedelta(minutes=1)), _incident("inc-oldest", noon - timedelta(minutes=1))]
+    client.portal.call(client.app.state.db.incidents.insert_many, docs)
+    headers = auth_headers(client.app, user_id="admin-1", role="admin")
+    
+    pages = _pages(client, headers, limit=2)
+    assert pages == [
+        ["inc-newest", "inc-4"], ["inc-3", "inc-2"], ["inc-1", "inc-0"], ["inc-oldest"],
+    ]
+    
+    # A last page that is exactly full has no cursor either, so no empty page follows
+    assert _pages(client, headers, limit=7) == [[doc["id"] for doc in sorted(
+        docs, key=lambda doc: (doc["created_at"], doc["id"]), reverse=True
+    )]]
+
+def test_invalid_cursor_is_rejected(client):
+    headers = auth_headers(client.app)
+    for cursor in ("not-a-cursor", "eyJjIjoxfQ"):
+        response = client.get("/api/incidents", params={"after": cursor}, headers=headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid pagination cursor"
+
+def test_incident_written_with_a_string_date_after_migrating_is_paged():
+    first = make_app()
+    with TestClient(first) as client:
+        db = first.state.db
+        noon = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+        docs = [_incident(f"inc-{i}", noon - timedelta(minutes=i)) for i in range(3)]
+        # e.g. written by an older app version after this one had already migrated
+        docs.append(_incident("inc-legacy", (noon - timedelta(seconds=90)).isoformat()))
+        client.portal.call(db.incidents.insert_many, docs)
+    
+    second = make_app(database=db)
+    with TestClient(second) as client:
+        headers = auth_headers(second, user_id="admin-1", role="admin")
+        pages = _pages(client, headers, limit=2)
+    assert sum(pages, []) == ["inc-0", "inc-1", "inc-legacy", "inc-2"]
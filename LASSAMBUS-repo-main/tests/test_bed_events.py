@@ -0,0 +1,104 @@
+"""Bed availability pub/sub, SSE stream and hospital change stream"""
+import asyncio
+
+from app.utils.bed_events import BedEventBroker, sse_stream, watch_hospital_changes
+from tests.conftest import with_scratch_db
+
+async def _connected():
+    return False
+
+def test_stream_subscribes_only_while_iterating():
+    async def run():
+        broker = BedEventBroker(max_subscribers=1)
+        stream = sse_stream(broker, lambda: {"hosp-1": 3}, _connected, coalesce_seconds=0)
+        # A response that never starts iterating must not hold a slot
+        assert not broker.subscribers
+        
+        assert (await stream.__anext__()).startswith("event: snapshot")
+        assert len(broker.subscribers) == 1
+        
+        broker.publish("hosp-1", 2)
+        broker.publish("hosp-1", 1)
+        assert await stream.__anext__() == 'event: beds\ndata: {"hosp-1":1}\n\n'
+        
+        await stream.aclose()
+        assert not broker.subscribers
+    
+    asyncio.run(run())
+
+def test_stream_reports_when_full():
+    async def run():
+        broker = BedEventBroker(max_subscribers=0)
+        events = [event async for event in sse_stream(broker, dict, _connected)]
+        assert len(events) == 1 and events[0].startswith("event: error")
+    
+    asyncio.run(run())
+
+class _FakeChangeStream:
+    def __init__(self, changes):
+        self.changes = changes
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def _iterate(self):
+        for change in self.changes:
+            yield change
+        raise asyncio.CancelledError
+    
+    def __aiter__(self):
+        return self._iterate()
+
+def test_change_stream_separates_bed_updates_from_other_writes():
+    changes = [
+        {"operationType": "update", "fullDocument": {"id": "hosp-1", "available_beds": 4},
+         "updateDescription": {"updatedFields": {"available_beds": 4}, "removedFields": []}},
+        {"operationType": "update", "fullDocument": {"id": "hosp-1", "available_beds": 4},
+         "updateDescription": {"updatedFields": {"phone": "01-000"}, "removedFields": []}},
+        {"operationType": "insert", "fullDocument": {"id": "hosp-9", "available_beds": 7}},
+    ]
+    
+    class Hospitals:
+        def watch(self, pipeline, full_document):
+            return _FakeChangeStream(changes)
+    
+    class Database:
+        hospitals = Hospitals()
+    
+    calls = []
+    
+    async def run():
+        try:
+            await watch_hospital_changes(Database(), lambda *beds: calls.append(beds), lambda: calls.append("reload"))
+        except asyncio.CancelledError:
+            pass
+    
+    asyncio.run(run())
+    assert calls == [("hosp-1", 4), "reload", ("hosp-1", 4), "reload", ("hosp-9", 7)]
+
+def test_change_stream_on_replica_set(replica_set_url):
+    async def check(db):
+        calls = []
+        changed = asyncio.Event()
+        
+        def on_beds(hospital_id, available_beds):
+            calls.append((hospital_id, available_beds))
+            changed.set()
+        
+        watcher = asyncio.create_task(watch_hospital_changes(db, on_beds, lambda: calls.append("reload")))
+        await asyncio.sleep(0.5)  # let the change stream open
+        try:
+            await db.hospitals.insert_one({"id": "hosp-1", "available_beds": 5})
+            await asyncio.wait_for(changed.wait(), 10)
+            changed.clear()
+            await db.hospitals.update_one({"id": "hosp-1"}, {"$inc": {"available_beds": -1}})
+            await asyncio.wait_for(changed.wait(), 10)
+        finally:
+            watcher.cancel()
+        return calls
+    
+    calls = asyncio.run(with_scratch_db(replica_set_url, check))
+    assert calls == ["reload", ("hosp-1", 5), ("hosp-1", 4)]
@@ -0,0 +1,90 @@
+"""Nearby-hospital lookup: rank modes, condition and expertise filters, batch queries"""
+# Apapa General Hospital (hosp-7): Emergency and Trauma only; Surulere (hosp-6) is the
+# nearest hospital with Neurology
+APAPA = {"lat": 6.4509, "lon": 3.3594}
+
+def _nearby(client, **params):
+    response = client.get("/api/hospitals/nearby", params={**APAPA, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def _empty_hospital(client, hospital_id: str):
+    client.portal.call(client.app.state.db.hospitals.update_one, {"id": hospital_id}, {"$set": {"available_beds": 0}})
+    client.app.state.services.reload_hospitals()
+
+def test_distance_rank_orders_by_distance(client):
+    hospitals = _nearby(client, limit=8)
+    assert hospitals[0]["id"] == "hosp-7"
+    assert len(hospitals) == 8
+    distances = [h["distance"] for h in hospitals]
+    assert distances == sorted(distances)
+
+def test_condition_requires_beds_but_not_expertise(client):
+    _empty_hospital(client, "hosp-7")
+    for rank in ("distance", "score", "eta"):
+        ids = [h["id"] for h in _nearby(client, condition="Neurology", rank=rank, limit=8)]
+        assert "hosp-7" not in ids
+        # Hospitals without Neurology are still offered
+        assert len(ids) == 7
+    
+    ids = [h["id"] for h in _nearby(client, limit=8)]
+    assert "hosp-7" in ids
+
+def test_expertise_filters_in_every_rank_mode(client):
+    for rank in ("distance", "score", "eta"):
+        hospitals = _nearby(client, expertise="neurology", rank=rank)
+        assert [h["id"] for h in hospitals] == ["hosp-6"]
+
+def test_score_rank_weighs_condition(client):
+    hospitals = _nearby(client, condition="Cardiology", rank="score", limit=8)
+    totals = [h["score"]["total"] for h in hospitals]
+    assert totals == sorted(totals, reverse=True)
+    by_id = {h["id"]: h["score"] for h in hospitals}
+    assert by_id["hosp-6"]["expertise"] > 0
+    assert by_id["hosp-7"]["expertise"] == 0.0
+    # Surulere lists Cardiology, which outweighs Apapa being closer
+    assert hospitals[0]["id"] == "hosp-6"
+
+def test_eta_rank_orders_by_travel_time(client):
+    hospitals = _nearby(client, rank="eta", limit=8)
+    minutes = [h["eta_minutes"] for h in hospitals]
+    assert minutes == sorted(minutes)
+    assert all(h["eta_source"] in ("table", "estimate") for h in hospitals)
+
+def test_max_km_limits_the_radius(client):
+    hospitals = _nearby(client, max_km=5, limit=8)
+    assert hospitals and all(h["distance"] <= 5 for h in hospitals)
+    assert "hosp-5" not in [h["id"] for h in hospitals]
+
+def test_batch_answers_each_query_in_order(client):
+    _empty_hospital(client, "hosp-7")
+    queries = [
+        {**APAPA, "condition": "Trauma"},
+        {"lat": 6.5833, "lon": 3.9833},
+        APAPA,
+    ]
+    for rank in ("distance", "score", "eta"):
+        response = client.post("/api/hospitals/nearby/batch", json={"queries": queries, "limit": 3, "rank": rank})
+        assert response.status_code == 200
+        results = response.json()
+        assert [(r["lat"], r["lon"], r["condition"]) for r in results] == [
+            (6.4509, 3.3594, "Trauma"), (6.5833, 3.9833, None), (6.4509, 3.3594, None),
+        ]
+        assert all(len(r["hospitals"]) == 3 for r in results)
+        # Only the query with a condition requires free beds
+        assert "hosp-7" not in [h["id"] for h in results[0]["hospitals"]]
+        assert "hosp-7" in [h["id"] for h in results[2]["hospitals"]]
+        if rank == "distance":
+            assert results[1]["hospitals"][0]["id"] == "hosp-8"
+        if rank == "score":
+            assert all("score" in h for r in results for h in r["hospitals"])
+        if rank == "eta":
+            assert all("eta_minutes" in h for r in results for h in r["hospitals"])
+
+def test_batch_matches_single_queries(client):
+    queries = [{**APAPA, "condition": "Cardiology"}, {"lat": 6.6198, "lon": 3.5073, "condition": "Pediatrics"}]
+    response = client.post("/api/hospitals/nearby/batch", json={"queries": queries, "limit": 5, "rank": "score"})
+    assert response.status_code == 200
+    for query, result in zip(queries, response.json()):
+        single = client.get("/api/hospitals/nearby", params={**query, "limit": 5, "rank": "score"}).json()
+        assert [h["id"] for h in result["hospitals"]] == [h["id"] for h in single]
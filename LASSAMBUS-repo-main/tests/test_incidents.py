@@ -0,0 +1,106 @@
+"""Incident routes: bed reservation on transfer and bulk creation"""
+import pytest
+
+import app.routers.incidents as incidents_router
+from tests.conftest import auth_headers
+
+REPORT = {
+    "patient_name": "Patient", "patient_sex": "Male", "location": "Allen Avenue", "lga": "Ikeja",
+    "description": "Collapsed at a bus stop", "action_taken": "Oxygen given on scene",
+}
+
+@pytest.fixture
+def headers(client):
+    return auth_headers(client.app)
+
+def _set_beds(client, hospital_id: str, beds: int):
+    client.portal.call(client.app.state.db.hospitals.update_one, {"id": hospital_id}, {"$set": {"available_beds": beds}})
+    client.app.state.services.reload_hospitals()
+
+def _beds(client, hospital_id: str) -> int:
+    hospital = client.portal.call(client.app.state.db.hospitals.find_one, {"id": hospital_id})
+    return hospital["available_beds"]
+
+def _new_incident(client, headers) -> str:
+    response = client.post("/api/incidents", json=REPORT, headers=headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def _transfer(client, headers, incident_id: str, hospital_id=None):
+    body = {"transfer_to_hospital": hospital_id is not None, "hospital_id": hospital_id}
+    return client.patch(f"/api/incidents/{incident_id}", json=body, headers=headers)
+
+def test_full_hospital_rejects_the_transfer(client, headers):
+    incident_id = _new_incident(client, headers)
+    _set_beds(client, "hosp-8", 0)
+    
+    response = _transfer(client, headers, incident_id, "hosp-8")
+    assert response.status_code == 409
+    assert _beds(client, "hosp-8") == 0
+    stored = client.portal.call(client.app.state.db.incidents.find_one, {"id": incident_id})
+    assert not stored["transfer_to_hospital"] and stored.get("reserved_hospital_id") is None
+
+def test_resent_transfer_keeps_its_one_bed(client, headers):
+    incident_id = _new_incident(client, headers)
+    _set_beds(client, "hosp-8", 2)
+    
+    for _ in range(3):
+        response = _transfer(client, headers, incident_id, "hosp-8")
+        assert response.status_code == 200
+        assert "reserved_hospital_id" not in response.json()
+    assert _beds(client, "hosp-8") == 1
+    # The bed count the API serves follows the database
+    listed = {h["id"]: h["available_beds"] for h in client.get("/api/hospitals").json()}
+    assert listed["hosp-8"] == 1
+
+def test_moving_or_cancelling_a_transfer_releases_the_bed(client, headers):
+    incident_id = _new_incident(client, headers)
+    _set_beds(client, "hosp-7", 5)
+    _set_beds(client, "hosp-8", 5)
+    
+    assert _transfer(client, headers, incident_id, "hosp-7").status_code == 200
+    assert (_beds(client, "hosp-7"), _beds(client, "hosp-8")) == (4, 5)
+    
+    assert _transfer(client, headers, incident_id, "hosp-8").status_code == 200
+    assert (_beds(client, "hosp-7"), _beds(client, "hosp-8")) == (5, 4)
+    
+    assert _transfer(client, headers, incident_id).status_code == 200
+    assert (_beds(client, "hosp-7"), _beds(client, "hosp-8")) == (5, 5)
+
+def test_incident_deleted_after_reserving_gives_the_bed_back(client, headers, monkeypatch):
+    incident_id = _new_incident(client, headers)
+    _set_beds(client, "hosp-8", 5)
+    reserve_bed = incidents_router.reserve_bed
+    
+    async def reserve_then_delete(db, services, hospital_id):
+        await reserve_bed(db, services, hospital_id)
+        await db.incidents.delete_one({"id": incident_id})
+    
+    monkeypatch.setattr(incidents_router, "reserve_bed", reserve_then_delete)
+    response = _transfer(client, headers, incident_id, "hosp-8")
+    assert response.status_code == 404
+    assert _beds(client, "hosp-8") == 5
+
+def test_bulk_reports_each_item(client, headers):
+    existing = _new_incident(client, headers)
+    items = [
+        {**REPORT, "id": "offline-1"},
+        {**REPORT, "id": existing},
+        {**REPORT, "lga": "Atlantis"},
+        {**REPORT, "id": "offline-2", "created_at": "2025-01-01T08:00:00Z"},
+        {**REPORT, "id": "offline-1"},
+    ]
+    response = client.post("/api/incidents/bulk", json={"items": items}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    
+    assert [result["status"] for result in body["results"]] == ["created", "duplicate", "invalid", "created", "duplicate"]
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3, 4]
+    assert "lga" in body["results"][2]["error"]
+    assert (body["created"], body["failed"]) == (2, 3)
+    
+    stored = client.portal.call(
+        lambda: client.app.state.db.incidents.find({"id": {"$in": ["offline-1", "offline-2"]}}).to_list(None)
+    )
+    assert sorted(doc["id"] for doc in stored) == ["offline-1", "offline-2"]
+    assert client.portal.call(client.app.state.db.incidents.count_documents, {}) == 3
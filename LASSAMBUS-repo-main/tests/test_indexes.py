@@ -0,0 +1,32 @@
+"""Query-plan checks against a real MongoDB (see conftest.py for TEST_MONGO_URL)"""
+import asyncio
+
+import pytest
+
+from app.indexes import INDEXES, ensure_indexes, verify_query_plans
+from tests.conftest import with_scratch_db
+
+def test_router_queries_use_indexes(mongo_url):
+    async def check(db):
+        await ensure_indexes(db)
+        return await verify_query_plans(db)
+    
+    results = asyncio.run(with_scratch_db(mongo_url, check))
+    assert all("IXSCAN" in stages for stages in results.values())
+
+def test_every_declared_index_is_created(mongo_url):
+    async def check(db):
+        await ensure_indexes(db)
+        return {collection: set(await db[collection].index_information()) for collection in INDEXES}
+    
+    created = asyncio.run(with_scratch_db(mongo_url, check))
+    for collection, indexes in INDEXES.items():
+        assert {index.document["name"] for index in indexes} <= created[collection]
+
+def test_duplicate_emails_stop_startup(mongo_url):
+    async def check(db):
+        await db.users.insert_many([{"email": "crew@example.com"}, {"email": "crew@example.com"}])
+        with pytest.raises(RuntimeError, match="email_unique"):
+            await ensure_indexes(db)
+    
+    asyncio.run(with_scratch_db(mongo_url, check))
@@ -0,0 +1,111 @@
+"""LGA resolution from coordinates"""
+import json
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app.models.incident import IncidentCreate
+from app.utils.lga_resolver import LgaResolver, load_lga_resolver
+from tests.conftest import make_app, auth_headers
+
+def _square(name: str, west: float, south: float, size: float = 0.1) -> dict:
+    ring = [[west, south], [west + size, south], [west + size, south + size], [west, south + size], [west, south]]
+    return {"type": "Feature", "properties": {"name": name}, "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+BOUNDARIES = {
+    "type": "FeatureCollection",
+    "features": [
+        _square("IKEJA", 3.3, 6.6),
+        _square("Eti-Osa", 3.4, 6.6),
+        _square("Lagos Lagoon", 3.5, 6.6),
+    ],
+}
+
+@pytest.fixture
+def resolver():
+    return LgaResolver.from_geojson(BOUNDARIES)
+
+def _report(resolver, **fields) -> IncidentCreate:
+    incident = IncidentCreate(
+        patient_name="Patient", patient_sex="Female", location="Allen Avenue",
+        description="Collapsed at a bus stop", action_taken="Oxygen given on scene", **fields
+    )
+    incident.resolve_lga(resolver)
+    return incident
+
+def test_names_are_matched_to_valid_lgas_and_others_skipped(resolver):
+    assert resolver.lgas == ["Eti-Osa", "Ikeja"]
+    assert resolver.resolve(6.65, 3.35) == "Ikeja"
+    assert resolver.resolve(6.65, 3.55) is None
+
+def test_missing_lga_is_filled_in(resolver):
+    incident = _report(resolver, latitude=6.65, longitude=3.45)
+    assert incident.lga == "Eti-Osa" and incident.reported_lga is None
+
+def test_mismatched_lga_is_corrected_and_kept(resolver):
+    incident = _report(resolver, lga="Ikeja", latitude=6.65, longitude=3.45, reported_lga="Epe")
+    assert incident.lga == "Eti-Osa"
+    assert incident.reported_lga == "Ikeja"
+
+def test_lga_is_taken_as_reported_outside_the_boundaries(resolver):
+    incident = _report(resolver, lga="Epe", latitude=6.65, longitude=3.55)
+    assert incident.lga == "Epe" and incident.reported_lga is None
+
+def test_each_app_resolves_with_its_own_boundaries(resolver):
+    report = {
+        "patient_name": "Patient", "patient_sex": "Female", "location": "Allen Avenue",
+        "description": "Collapsed at a bus stop", "action_taken": "Oxygen given on scene",
+        "latitude": 6.65, "longitude": 3.45,
+    }
+    with_boundaries, without = make_app(), make_app()
+    with_boundaries.state.services.lga_resolver = resolver
+    
+    with TestClient(with_boundaries) as client:
+        response = client.post("/api/incidents", json=report, headers=auth_headers(client.app))
+        assert response.status_code == 200
+        assert response.json()["lga"] == "Eti-Osa"
+    with TestClient(without) as client:
+        response = client.post("/api/incidents", json=report, headers=auth_headers(client.app))
+        assert response.status_code == 422
+        assert response.json()["detail"] == "lga is required unless it can be resolved from latitude and longitude"
+
+def test_points_outside_every_lga_resolve_to_none(resolver):
+    # Beyond the grid on each side
+    for lat, lon in ((6.65, 3.1), (6.65, 3.9), (6.4, 3.35), (6.9, 3.35)):
+        assert resolver.resolve(lat, lon) is None
+    # Inside the grid, in a gap between boundaries
+    gapped = LgaResolver.from_geojson({"type": "FeatureCollection", "features": [
+        _square("Ikeja", 3.3, 6.6), _square("Epe", 3.5, 6.6),
+    ]})
+    assert gapped.resolve(6.65, 3.45) is None
+    assert LgaResolver.from_geojson({"type": "FeatureCollection", "features": []}).resolve(6.65, 3.35) is None
+
+def test_unknown_boundaries_are_skipped():
+    resolver = LgaResolver.from_geojson({"type": "FeatureCollection", "features": [
+        _square("Lagos Lagoon", 3.3, 6.6), _square("Atlantis", 3.4, 6.6),
+    ]})
+    assert resolver.polygons == [] and resolver.lgas == []
+    assert resolver.resolve(6.65, 3.35) is None
+
+def test_holes_and_multipolygons():
+    outer = [[3.3, 6.6], [3.5, 6.6], [3.5, 6.8], [3.3, 6.8], [3.3, 6.6]]
+    hole = [[3.35, 6.65], [3.45, 6.65], [3.45, 6.75], [3.35, 6.75], [3.35, 6.65]]
+    island = [[3.6, 6.6], [3.7, 6.6], [3.7, 6.7], [3.6, 6.7], [3.6, 6.6]]
+    resolver = LgaResolver.from_geojson({
+        "type": "Feature", "properties": {"ADM2_EN": "Lagos Island"},
+        "geometry": {"type": "MultiPolygon", "coordinates": [[outer, hole], [island]]},
+    })
+    assert resolver.resolve(6.62, 3.32) == "Lagos Island"
+    assert resolver.resolve(6.65, 3.65) == "Lagos Island"
+    assert resolver.resolve(6.7, 3.4) is None
+
+def test_missing_or_unreadable_boundary_file_loads_nothing(tmp_path):
+    assert load_lga_resolver(None) is None
+    assert load_lga_resolver(str(tmp_path / "missing.geojson")) is None
+    broken = tmp_path / "broken.geojson"
+    broken.write_text("{not json")
+    assert load_lga_resolver(str(broken)) is None
+    valid = tmp_path / "lgas.geojson"
+    valid.write_text(json.dumps(BOUNDARIES))
+    assert load_lga_resolver(str(valid)).lgas == ["Eti-Osa", "Ikeja"]
@@ -0,0 +1,66 @@
+"""Rate limiter: async storage, circuit breaker and login failure budget"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.rate_limit import RateLimiter
+
+class _DeadStorage:
+    """Strategy stand-in whose store fails (or hangs) on every call"""
+    
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = 0
+    
+    async def hit(self, *args):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        raise ConnectionError("store down")
+    
+    test = hit
+
+@pytest.mark.parametrize("delay", [0, 1])
+def test_breaker_counts_in_memory_while_the_store_is_down(delay):
+    limiter = RateLimiter("async+redis://unused", timeout=0.05, breaker_seconds=60)
+    limiter._strategy = dead = _DeadStorage(delay)
+    
+    async def run():
+        for _ in range(2):
+            await limiter.hit("2/minute", "scope", "key")
+        with pytest.raises(HTTPException) as excinfo:
+            await limiter.hit("2/minute", "scope", "key")
+        return excinfo.value
+    
+    rejection = asyncio.run(run())
+    # Only the first request waited on the store; the rest were counted in memory
+    assert dead.calls == 1
+    assert rejection.status_code == 429 and int(rejection.headers["Retry-After"]) >= 1
+
+def test_login_only_counts_failed_attempts(client, monkeypatch):
+    import app.routers.auth as auth
+    from passlib.hash import bcrypt
+    monkeypatch.setattr(auth, "RATE_LIMIT_LOGIN_PER_ACCOUNT", "2/minute")
+    # The test client always connects from one address; let each call pick its own
+    monkeypatch.setattr(auth, "get_remote_address", lambda request: request.headers["x-test-address"])
+    client.portal.call(client.app.state.db.users.insert_one, {
+        "id": "user-1", "email": "crew@example.com", "full_name": "Crew Member", "role": "personnel",
+        "password": bcrypt.using(rounds=4).hash("Correct-Horse-1"),
+    })
+    
+    def login(password, address="10.0.0.1"):
+        return client.post(
+            "/api/auth/login",
+            json={"email": "crew@example.com", "password": password},
+            headers={"X-Test-Address": address},
+        )
+    
+    # Successful logins never use up the account's budget
+    for _ in range(3):
+        assert login("Correct-Horse-1").status_code == 200
+    assert login("wrong").status_code == 401
+    assert login("wrong").status_code == 401
+    # Guessing is cut off once the failures are spent, even with the right password
+    assert login("Correct-Horse-1").status_code == 429
+    # ...but only from that address: the owner elsewhere still gets in
+    assert login("Correct-Horse-1", address="10.0.0.2").status_code == 200
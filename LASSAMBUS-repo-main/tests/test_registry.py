@@ -0,0 +1,76 @@
+"""Hospital registry sync: change detection by hash and bulk upsert counts"""
+import asyncio
+
+import pytest
+
+from app.registry import REGISTRY_STATE_COLLECTION, load_registry, sync_registry
+
+HEADER = "id,name,address,lga,bed_capacity,available_beds,expertise,phone,latitude,longitude\n"
+
+def _row(hospital_id: str, name: str, beds: int = 10, expertise: str = "Emergency;Trauma") -> str:
+    return f"{hospital_id},{name},Address,Ikeja,{beds},{beds},{expertise},01-000-0000,6.59,3.34\n"
+
+@pytest.fixture
+def db():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["test"]
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "hospitals.csv"
+    path.write_text(HEADER + _row("hosp-a", "Alpha") + _row("hosp-b", "Beta") + _row("hosp-c", "Gamma"))
+    return path
+
+def test_unchanged_file_is_skipped(db, registry):
+    async def run():
+        first = await sync_registry(db, registry)
+        second = await sync_registry(db, registry)
+        state = await db[REGISTRY_STATE_COLLECTION].find_one({})
+        forced = await sync_registry(db, registry, force=True)
+        return first, second, state, forced
+    
+    first, second, state, forced = asyncio.run(run())
+    assert first == {"skipped": False, "rows": 3, "matched": 0, "modified": 0, "inserted": 3}
+    assert second == {"skipped": True}
+    assert state["rows"] == 3 and len(state["sha256"]) == 64
+    # Forcing rewrites the same values, so nothing is modified
+    assert forced == {"skipped": False, "rows": 3, "matched": 3, "modified": 0, "inserted": 0}
+
+def test_changed_file_upserts_in_batches_and_keeps_live_beds(db, registry):
+    async def run():
+        await sync_registry(db, registry)
+        await db.hospitals.update_one({"id": "hosp-a"}, {"$set": {"available_beds": 4}})
+        registry.write_text(
+            HEADER + _row("hosp-a", "Alpha", beds=30) + _row("hosp-b", "Beta Renamed")
+            + _row("hosp-c", "Gamma") + _row("hosp-d", "Delta")
+        )
+        counts = await sync_registry(db, registry, batch_size=2)
+        hospitals = {doc["id"]: doc async for doc in db.hospitals.find({}, {"_id": 0})}
+        return counts, hospitals
+    
+    counts, hospitals = asyncio.run(run())
+    assert counts == {"skipped": False, "rows": 4, "matched": 3, "modified": 2, "inserted": 1}
+    assert hospitals["hosp-b"]["name"] == "Beta Renamed"
+    # Capacity follows the file; free beds are live state and are left alone
+    assert hospitals["hosp-a"]["bed_capacity"] == 30
+    assert hospitals["hosp-a"]["available_beds"] == 4
+    assert hospitals["hosp-d"]["available_beds"] == 10
+    assert hospitals["hosp-d"]["location"] == {"type": "Point", "coordinates": [3.34, 6.59]}
+    assert hospitals["hosp-c"]["expertise"] == ["Emergency", "Trauma"]
+
+def test_failed_sync_is_retried(db, registry):
+    registry.write_text(HEADER + _row("hosp-a", "Alpha") + _row("hosp-a", "Alpha Again"))
+    
+    async def run():
+        with pytest.raises(ValueError, match="hospitals.csv:3: duplicate hospital id 'hosp-a'"):
+            await sync_registry(db, registry)
+        # No hash is recorded, so the fixed file is synced rather than skipped
+        registry.write_text(HEADER + _row("hosp-a", "Alpha"))
+        return await sync_registry(db, registry)
+    
+    assert asyncio.run(run())["inserted"] == 1
+
+def test_invalid_row_names_the_line_and_field(registry):
+    registry.write_text(HEADER + _row("hosp-a", "Alpha") + "hosp-b,Beta,Address,Ikeja,10,10,Emergency,01,north,3.34\n")
+    with pytest.raises(ValueError, match=r"hospitals.csv:3: latitude"):
+        load_registry(registry)
@@ -0,0 +1,75 @@
+"""Incident rollups: incremental updates against a full rebuild"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.rollups import (
+    ROLLUP_COLLECTION, bucket_start, rebuild_rollups, record_incidents_created, record_transfer_change
+)
+from tests.conftest import with_scratch_db
+
+START = datetime(2025, 3, 1, 22, 15, tzinfo=timezone.utc)
+LGAS = ("Ikeja", "Epe", "Surulere")
+
+def _incidents() -> list:
+    # Spread over hours either side of midnight, so hour and day buckets both differ
+    return [
+        {
+            "id": f"inc-{i}", "lga": LGAS[i % len(LGAS)], "transfer_to_hospital": i % 4 == 0,
+            "created_at": START + timedelta(minutes=37 * i),
+        }
+        for i in range(24)
+    ]
+
+async def _record_incrementally(db, incidents: list):
+    """Write incidents the way the routes do: single and bulk creates, then transfer flips"""
+    await db.incidents.insert_many([dict(doc) for doc in incidents])
+    await record_incidents_created(db, incidents[:1])
+    await record_incidents_created(db, incidents[1:])
+    for doc in incidents[::5]:
+        flipped = not doc["transfer_to_hospital"]
+        await db.incidents.update_one({"id": doc["id"]}, {"$set": {"transfer_to_hospital": flipped}})
+        await record_transfer_change(db, doc, flipped)
+
+async def _rollups(db) -> dict:
+    return {
+        doc["_id"]: (doc["granularity"], doc["bucket"], doc["lga"], doc["total"], doc["transferred"])
+        async for doc in db[ROLLUP_COLLECTION].find()
+    }
+
+def test_incremental_rollups_count_every_bucket():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+    incidents = _incidents()
+    
+    async def run():
+        await _record_incrementally(db, incidents)
+        return await _rollups(db)
+    
+    rollups = asyncio.run(run())
+    stored = {doc["id"]: doc for doc in incidents}
+    for doc in incidents[::5]:
+        stored[doc["id"]] = {**doc, "transfer_to_hospital": not doc["transfer_to_hospital"]}
+    for granularity in ("hour", "day"):
+        keys = [(bucket_start(doc["created_at"], granularity), doc["lga"]) for doc in stored.values()]
+        totals = Counter(keys)
+        transferred = Counter(key for key, doc in zip(keys, stored.values()) if doc["transfer_to_hospital"])
+        counted = {
+            (bucket, lga): (total, moved)
+            for g, bucket, lga, total, moved in rollups.values() if g == granularity
+        }
+        assert counted == {key: (totals[key], transferred[key]) for key in totals}
+
+def test_incremental_rollups_match_a_full_rebuild(mongo_url):
+    """$dateTrunc and $merge need a real server"""
+    async def check(db):
+        await _record_incrementally(db, _incidents())
+        incremental = await _rollups(db)
+        await db[ROLLUP_COLLECTION].drop()
+        await rebuild_rollups(db)
+        return incremental, await _rollups(db)
+    
+    incremental, rebuilt = asyncio.run(with_scratch_db(mongo_url, check))
+    assert incremental == rebuilt
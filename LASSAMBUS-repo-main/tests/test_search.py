@@ -0,0 +1,80 @@
+"""Incident text search and its (score, created_at, id) cursor"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.indexes import ensure_indexes
+from app.routers.incidents import search_incidents
+from app.utils.pagination import decode_search_cursor, encode_search_cursor, search_keyset_filter
+from tests.conftest import with_scratch_db
+
+NOON = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+SORT = {"score": -1, "created_at": -1, "id": -1}
+
+def _incident(incident_id: str, patient_name: str, created_at: datetime) -> dict:
+    return {
+        "id": incident_id, "patient_name": patient_name, "patient_sex": "Female", "location": "Allen Avenue",
+        "lga": "Ikeja", "description": "Collapsed at a bus stop", "action_taken": "Oxygen given on scene",
+        "transfer_to_hospital": False, "personnel_id": "user-1", "personnel_name": "Crew Member",
+        "created_at": created_at,
+    }
+
+def test_cursor_round_trip():
+    cursor = encode_search_cursor(1.5, NOON, "inc-1")
+    assert decode_search_cursor(cursor) == (1.5, NOON, "inc-1")
+    with pytest.raises(ValueError):
+        decode_search_cursor("not-a-cursor")
+
+def test_cursor_filter_pages_through_tied_scores():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["hits"]
+    # Stand-ins for scored hits: ties on score, and on score and created_at
+    hits = [
+        {"id": f"inc-{i}", "score": score, "created_at": NOON - timedelta(minutes=minutes)}
+        for i, (score, minutes) in enumerate([(2.0, 0), (1.0, 0), (1.0, 0), (1.0, 5), (1.0, 5), (0.5, 0), (2.0, 1)])
+    ]
+    
+    async def pages(limit):
+        await collection.insert_many([dict(hit) for hit in hits])
+        seen, cursor = [], None
+        while True:
+            pipeline = []
+            if cursor:
+                pipeline.append({"$match": search_keyset_filter(*decode_search_cursor(cursor))})
+            pipeline += [{"$sort": SORT}, {"$limit": limit}]
+            page = await collection.aggregate(pipeline).to_list(limit)
+            seen += [hit["id"] for hit in page]
+            if len(page) < limit:
+                return seen
+            last = page[-1]
+            cursor = encode_search_cursor(last["score"], last["created_at"], last["id"])
+    
+    expected = [hit["id"] for hit in sorted(hits, key=lambda h: (h["score"], h["created_at"], h["id"]), reverse=True)]
+    assert asyncio.run(pages(2)) == expected
+
+def test_search_pages_through_tied_scores(mongo_url):
+    """Full route on a real server, since the in-memory database has no $text"""
+    async def check(db):
+        await ensure_indexes(db)
+        # Same patient name and text, so every hit scores the same
+        await db.incidents.insert_many([
+            _incident(f"inc-{i}", "Adaeze Okafor", NOON - timedelta(minutes=i // 2)) for i in range(5)
+        ] + [_incident("inc-other", "Tunde Bello", NOON)])
+        
+        seen, after = [], None
+        while True:
+            response = await search_incidents(
+                q="adaeze", lga=None, start=None, end=None, after=after, limit=2,
+                payload={"sub": "admin-1", "role": "admin"}, db=db,
+            )
+            page = json.loads(response.body)
+            assert len({hit["score"] for hit in page}) <= 1
+            seen += [hit["id"] for hit in page]
+            after = response.headers.get("X-Next-Cursor")
+            if after is None:
+                return seen
+    
+    seen = asyncio.run(with_scratch_db(mongo_url, check))
+    assert seen == ["inc-1", "inc-0", "inc-3", "inc-2", "inc-4"]
@@ -0,0 +1,58 @@
+"""Token verification cache and revocation"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.utils.jwt import TokenVerifier
+from tests.conftest import make_app
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+def _claims(user_id: str) -> dict:
+    return {"sub": user_id, "email": f"{user_id}@example.com", "role": "admin"}
+
+def test_logout_revokes_the_token_in_every_worker():
+    first = make_app()
+    with TestClient(first) as worker_a:
+        db = first.state.db
+        second = make_app(database=db)
+        with TestClient(second) as worker_b:
+            token = first.state.services.tokens.create(_claims("admin-1"))
+            # Verified, and cached, by both workers before the logout
+            assert worker_a.get("/api/incidents", headers=_auth(token)).status_code == 200
+            assert worker_b.get("/api/incidents", headers=_auth(token)).status_code == 200
+            
+            assert worker_a.post("/api/auth/logout", headers=_auth(token)).status_code == 204
+            assert worker_a.get("/api/incidents", headers=_auth(token)).json()["detail"] == "Token revoked"
+            
+            worker_b.portal.call(second.state.services.tokens.sync_revocations, db)
+            assert worker_b.get("/api/incidents", headers=_auth(token)).json()["detail"] == "Token revoked"
+    
+    # A worker started later loads the revocation at startup
+    with TestClient(make_app(database=db)) as worker_c:
+        assert worker_c.get("/api/incidents", headers=_auth(token)).json()["detail"] == "Token revoked"
+
+def test_revocations_survive_cache_pressure_until_expiry():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    verifier = TokenVerifier("secret", cache_size=1)
+    tokens = [verifier.create(_claims(f"user-{i}")) for i in range(5)]
+    
+    async def revoke_all():
+        for token in tokens:
+            await verifier.revoke(db, token)
+    
+    asyncio.run(revoke_all())
+    for token in tokens:
+        with pytest.raises(HTTPException, match="Token revoked"):
+            verifier.decode(token)
+    
+    # Entries go once their token has expired anyway
+    verifier.revoked["expired-digest"] = time.time() - 1
+    asyncio.run(verifier.sync_revocations(db))
+    assert "expired-digest" not in verifier.revoked
+    assert len(verifier.revoked) == 5
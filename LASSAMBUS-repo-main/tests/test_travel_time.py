@@ -0,0 +1,93 @@
+"""Travel-time table: building, lookups, time bands and ETA ranking"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.travel_time import UNKNOWN, TravelTimeTable, build_table, parse_bands
+
+BANDS = parse_bands("night:0-6,day:6-18,evening:18-24")
+# Two origins about 3 km apart, and a third in the same cell as the first
+IKEJA, YABA, IKEJA_NEARBY = (6.6011, 3.3512), (6.5103, 3.3721), (6.6019, 3.3518)
+
+@pytest.fixture
+def table() -> TravelTimeTable:
+    return build_table([
+        (*IKEJA, "hosp-1", "day", 600),
+        (*IKEJA_NEARBY, "hosp-1", "day", 900),
+        (*IKEJA, "hosp-3", "day", 1200),
+        (*IKEJA, "hosp-1", "night", 300),
+        (*YABA, "hosp-3", "evening", 1500),
+        # Outside the grid, and in a band the table does not have
+        (9.0, 7.5, "hosp-1", "day", 100),
+        (*IKEJA, "hosp-1", "rush", 100),
+    ], BANDS)
+
+def test_parse_bands_sorts_and_checks_coverage():
+    assert [band["name"] for band in parse_bands("b:6-24,a:0-6")] == ["a", "b"]
+    for spec in ("a:0-6,b:7-24", "a:0-6,b:6-20", "a:0-6,b:4-24", "a:0-0,b:0-24", "a:6-24"):
+        with pytest.raises(ValueError, match="contiguous"):
+            parse_bands(spec)
+    with pytest.raises(ValueError):
+        parse_bands("a:zero-24")
+
+def test_build_averages_samples_and_skips_unusable_trips(table):
+    assert table.hospital_ids == ["hosp-1", "hosp-3"]
+    assert len(table.cells) == 2
+    columns = table.column_map(["hosp-1", "hosp-3"])
+    day, night, evening = 1, 0, 2
+    # Two samples in the same cell, band and hospital are averaged
+    np.testing.assert_array_equal(table.lookup(*IKEJA, columns, day), [750, 1200])
+    np.testing.assert_array_equal(table.lookup(*IKEJA, columns, night), [300, np.nan])
+    np.testing.assert_array_equal(table.lookup(*YABA, columns, evening), [np.nan, 1500])
+    assert table.seconds[evening, list(table.cells).index(table.cell_id(*IKEJA)), 0] == UNKNOWN
+
+def test_lookup_outside_the_grid_or_covered_cells(table):
+    columns = table.column_map(["hosp-1"])
+    assert table.cell_id(9.0, 7.5) is None
+    assert table.lookup(9.0, 7.5, columns, 0) is None
+    assert table.lookup(6.45, 3.40, columns, 0) is None
+    # Hospitals the table does not know map to -1 and read as unknown
+    columns = table.column_map(["hosp-9", "hosp-1"])
+    assert columns.tolist() == [-1, 0]
+    np.testing.assert_array_equal(table.lookup(*IKEJA, columns, 1), [np.nan, 750])
+
+def test_band_at_uses_the_tables_utc_offset(table):
+    # 05:30 UTC is 06:30 in Lagos (UTC+1): day, not night
+    assert table.band_at(datetime(2025, 3, 1, 5, 30, tzinfo=timezone.utc)) == 1
+    assert table.band_at(datetime(2025, 3, 1, 4, 59, tzinfo=timezone.utc)) == 0
+    # 17:30 UTC is 18:30 local; naive datetimes are taken as UTC
+    assert table.band_at(datetime(2025, 3, 1, 17, 30)) == 2
+    # 23:30 UTC wraps to 00:30 local
+    assert table.band_at(datetime(2025, 3, 1, 23, 30, tzinfo=timezone.utc)) == 0
+    assert table.band_at(datetime(2025, 3, 1, 5, 30, tzinfo=timezone(timedelta(hours=-5)))) == 1
+
+def test_save_and_load_round_trip(table, tmp_path):
+    table.save(tmp_path / "travel_times")
+    loaded = TravelTimeTable.load(tmp_path / "travel_times")
+    assert loaded.meta == table.meta
+    assert isinstance(loaded.seconds, np.memmap)
+    np.testing.assert_array_equal(loaded.cells, table.cells)
+    np.testing.assert_array_equal(loaded.seconds, table.seconds)
+    columns = loaded.column_map(["hosp-1", "hosp-3"])
+    np.testing.assert_array_equal(loaded.lookup(*IKEJA, columns, 1), [750, 1200])
+
+def test_load_rejects_other_versions_and_shapes(table):
+    with pytest.raises(ValueError, match="version"):
+        TravelTimeTable({**table.meta, "version": 99}, table.cells, table.seconds)
+    with pytest.raises(ValueError, match="shape"):
+        TravelTimeTable(table.meta, table.cells, table.seconds[:, :1])
+
+def test_eta_ranking_prefers_table_times_and_estimates_the_rest(client):
+    # hosp-3 (Gbagada) is farther than hosp-1 (LASUTH) from this origin but quicker to reach
+    table = build_table([(*IKEJA, "hosp-1", "all", 1800), (*IKEJA, "hosp-3", "all", 480)])
+    client.app.state.services.hospital_index.set_travel_table(table)
+    response = client.get("/api/hospitals/nearby", params={"lat": IKEJA[0], "lon": IKEJA[1], "rank": "eta", "limit": 8})
+    hospitals = {h["id"]: h for h in response.json()}
+    assert [h["id"] for h in response.json()][0] == "hosp-3"
+    assert (hospitals["hosp-3"]["eta_minutes"], hospitals["hosp-3"]["eta_source"]) == (8.0, "table")
+    assert (hospitals["hosp-1"]["eta_minutes"], hospitals["hosp-1"]["eta_source"]) == (30.0, "table")
+    assert hospitals["hosp-2"]["eta_source"] == "estimate"
+    # Outside the table's cells every ETA is estimated
+    response = client.get("/api/hospitals/nearby", params={"lat": 6.45, "lon": 3.40, "rank": "eta"})
+    assert {h["eta_source"] for h in response.json()} == {"estimate"}
@@ -0,0 +1,75 @@
+"""User profile cache: invalidation and expiry"""
+import asyncio
+import time
+
+import pytest
+
+from app.utils.user_cache import UserProfileCache
+from tests.conftest import auth_headers
+from tests.test_incidents import REPORT
+
+USER = {"id": "user-1", "email": "crew@example.com", "full_name": "Old Name", "role": "personnel", "password": "hash"}
+
+@pytest.fixture
+def db():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["test"]
+
+def _rename(db, name: str):
+    return db.users.update_one({"id": "user-1"}, {"$set": {"full_name": name}})
+
+def test_profile_change_shows_after_invalidation(db):
+    async def run():
+        cache = UserProfileCache()
+        await db.users.insert_one(dict(USER))
+        assert (await cache.profile(db, "user-1"))["full_name"] == "Old Name"
+        
+        await _rename(db, "New Name")
+        assert (await cache.profile(db, "user-1"))["full_name"] == "Old Name"
+        cache.invalidate("user-1")
+        profile = await cache.profile(db, "user-1")
+        assert profile["full_name"] == "New Name"
+        assert "password" not in profile
+    
+    asyncio.run(run())
+
+def test_profile_change_shows_after_expiry(db):
+    async def run():
+        cache = UserProfileCache(ttl=0.05)
+        await db.users.insert_one(dict(USER))
+        await cache.profile(db, "user-1")
+        await _rename(db, "New Name")
+        time.sleep(0.06)
+        assert (await cache.profile(db, "user-1"))["full_name"] == "New Name"
+    
+    asyncio.run(run())
+
+def test_invalidation_discards_a_load_in_flight():
+    async def run():
+        cache = UserProfileCache()
+        release = asyncio.Event()
+        
+        async def slow_load():
+            await release.wait()
+            return {"id": "user-1", "full_name": "Old Name"}
+        
+        load = asyncio.create_task(cache.get_or_load("user-1", slow_load))
+        await asyncio.sleep(0)
+        cache.invalidate("user-1")
+        release.set()
+        assert (await load)["full_name"] == "Old Name"
+        # The value read before the change is not kept
+        assert cache.get("user-1") is None
+    
+    asyncio.run(run())
+
+def test_incidents_use_the_new_name_after_invalidation(client):
+    db, services = client.app.state.db, client.app.state.services
+    client.portal.call(db.users.insert_one, dict(USER))
+    # No name claim, so the submitter is looked up through the profile cache
+    headers = auth_headers(client.app, name=None)
+    
+    assert client.post("/api/incidents", json=REPORT, headers=headers).json()["personnel_name"] == "Old Name"
+    client.portal.call(_rename, db, "New Name")
+    services.user_cache.invalidate("user-1")
+    assert client.post("/api/incidents", json=REPORT, headers=headers).json()["personnel_name"] == "New Name"